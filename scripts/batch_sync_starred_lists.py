@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""Sync the grouped star datasets of several GitHub accounts in one process."""
+
+from __future__ import annotations
+
+import argparse
+import contextvars
+import hashlib
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import sync_starred_lists as sync
+from stars_freshness import add_freshness_arguments
+from stars_http import (
+    CURRENT_ACCOUNT,
+    ConnectionPool,
+    ResponseCache,
+    add_cache_arguments,
+    add_scheduler_arguments,
+    cache_from_args,
+    configure_scheduler,
+)
+from stars_metrics import add_metrics_arguments, instrumented_run
+from stars_store import StarStore, add_store_arguments
+
+
+DEFAULT_ACCOUNT_WORKERS = 8
+ACCOUNT_PATH_KEYS = ("mapping", "output", "shard_dir", "changes", "search_index", "mapping_index")
+ACCOUNT_KEYS = {*ACCOUNT_PATH_KEYS, "username"}
+# Internal status of an account whose outputs were left as they were; it never becomes the exit code.
+ACCOUNT_UNCHANGED = -1
+
+
+class ManifestError(ValueError):
+    """The batch manifest is missing, malformed or sets something an account cannot have."""
+
+
+@dataclass
+class AccountResult:
+    label: str
+    status: int
+    seconds: float
+    requests: int
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Fetch GitHub stars for every account in a manifest and write each grouped JSON, "
+            "sharing one pool of request slots and one rate budget."
+        )
+    )
+    parser.add_argument(
+        "--manifest",
+        type=Path,
+        required=True,
+        help=(
+            'JSON file with {"accounts": [{"mapping": ..., "output": ...}, ...]}; an account may also '
+            "set username, shard_dir, changes, search_index and mapping_index."
+        ),
+    )
+    parser.add_argument(
+        "--account-workers",
+        type=int,
+        default=DEFAULT_ACCOUNT_WORKERS,
+        help=(
+            "Accounts synced at the same time; their requests take turns on the --concurrency "
+            f"slots (default: {DEFAULT_ACCOUNT_WORKERS})."
+        ),
+    )
+    sync.add_sync_arguments(parser)
+    parser.add_argument(
+        "--unchanged-exit-code",
+        type=int,
+        default=0,
+        help=(
+            "Exit status when no account's dataset changed and nothing was written, e.g. 3 so a "
+            "pipeline can skip the build and deploy (default: 0)."
+        ),
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Rebuild every account's outputs from --store without contacting GitHub.",
+    )
+    add_freshness_arguments(parser)
+    add_store_arguments(parser)
+    add_cache_arguments(parser)
+    add_scheduler_arguments(parser)
+    add_metrics_arguments(parser)
+    return parser.parse_args()
+
+
+def account_namespace(args: argparse.Namespace, entry: dict[str, Any]) -> argparse.Namespace:
+    """Return the run options of one manifest entry: the batch options plus its own paths."""
+    values = vars(args).copy()
+    values["username"] = entry.get("username")
+    values["unchanged_exit_code"] = ACCOUNT_UNCHANGED
+    for key in ACCOUNT_PATH_KEYS:
+        if key in entry:
+            values[key] = Path(entry[key])
+    if "mapping_index" not in entry:
+        # Accounts sharing one index file would evict each other's compiled mapping on every run.
+        digest = hashlib.sha256(str(values["mapping"]).encode("utf-8")).hexdigest()[:12]
+        index = args.mapping_index
+        values["mapping_index"] = index.with_name(f"{index.stem}-{digest}{index.suffix}")
+    return argparse.Namespace(**values)
+
+
+def load_manifest(args: argparse.Namespace) -> list[argparse.Namespace]:
+    try:
+        with args.manifest.open("r", encoding="utf-8") as handle:
+            manifest = json.load(handle)
+    except (OSError, ValueError) as error:
+        raise ManifestError(f"Could not read manifest {args.manifest}: {error}") from error
+
+    entries = manifest.get("accounts") if isinstance(manifest, dict) else None
+    if not isinstance(entries, list) or not entries:
+        raise ManifestError("Manifest must be a JSON object with a non-empty 'accounts' list.")
+
+    accounts: list[argparse.Namespace] = []
+    for position, entry in enumerate(entries, start=1):
+        if not isinstance(entry, dict):
+            raise ManifestError(f"Account {position} must be a JSON object.")
+        unknown = sorted(set(entry) - ACCOUNT_KEYS)
+        if unknown:
+            raise ManifestError(f"Account {position} has unknown keys: {', '.join(unknown)}.")
+        required = ["mapping"]
+        if args.format != "sharded":
+            required.append("output")
+        if args.format != "single":
+            required.append("shard_dir")
+        missing = [key for key in required if not isinstance(entry.get(key), str) or not entry[key]]
+        if missing:
+            raise ManifestError(f"Account {position} is missing {', '.join(missing)}.")
+        accounts.append(account_namespace(args, entry))
+
+    outputs = [path for account in accounts for path in sync.output_paths(account)]
+    if len(set(outputs)) != len(outputs):
+        raise ManifestError("Accounts must not share output paths.")
+    return accounts
+
+
+def account_label(account: argparse.Namespace) -> str:
+    if account.username:
+        return account.username
+    try:
+        username = sync.load_json_file(account.mapping).get("username")
+    except (OSError, ValueError, AttributeError):
+        username = None
+    return username if isinstance(username, str) and username else str(account.mapping)
+
+
+def sync_one(
+    account: argparse.Namespace,
+    label: str,
+    token: str | None,
+    cache: ResponseCache | None,
+    pool: ConnectionPool,
+) -> int:
+    CURRENT_ACCOUNT.set(label)
+    if account.mapping.exists() and sync.skip_if_fresh(account):
+        return ACCOUNT_UNCHANGED
+    # SQLite connections stay on the thread that opened them, so each account opens its own.
+    try:
+        store = StarStore(account.store) if account.store else None
+    except Exception as error:  # noqa: BLE001
+        print(f"Failed to open the store for {label}: {error}", file=sys.stderr)
+        return 1
+    try:
+        return sync.sync_account(account, token, cache, pool, store)
+    except Exception as error:  # noqa: BLE001
+        # One account's failure must not cost the others their results and the summary.
+        print(f"Failed to sync {label}: {error}", file=sys.stderr)
+        return 1
+    finally:
+        if store is not None:
+            store.close()
+
+
+def main() -> int:
+    args = parse_args()
+    with instrumented_run("batch_sync_starred_lists", args):
+        return run(args)
+
+
+def run(args: argparse.Namespace) -> int:
+    try:
+        accounts = load_manifest(args)
+    except ManifestError as error:
+        print(error, file=sys.stderr)
+        return 1
+
+    token = os.environ.get(args.token_env)
+    if not sync.check_run_options(args, token):
+        return 1
+
+    concurrency = max(1, args.concurrency)
+    scheduler = configure_scheduler(args, max_in_flight=concurrency)
+    cache = cache_from_args(args)
+    pool = ConnectionPool(max_idle_per_host=concurrency)
+
+    def timed_sync(account: argparse.Namespace) -> AccountResult:
+        started = time.perf_counter()
+        label = account_label(account)
+        # A fresh context per account keeps its label off the reused worker thread.
+        status = contextvars.copy_context().run(sync_one, account, label, token, cache, pool)
+        requests = scheduler.slots.granted.get(label, 0) if scheduler.slots is not None else 0
+        return AccountResult(label, status, time.perf_counter() - started, requests)
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=max(1, args.account_workers)) as executor:
+        results = list(executor.map(timed_sync, accounts))
+
+    print(f"Synced {len(results)} account(s):")
+    for result in results:
+        outcome = {0: "updated", ACCOUNT_UNCHANGED: "unchanged"}.get(result.status, "failed")
+        print(f"  {result.label}: {outcome} in {result.seconds:.2f}s, {result.requests} request(s)")
+
+    if any(result.status not in (0, ACCOUNT_UNCHANGED) for result in results):
+        return 1
+    if any(result.status == 0 for result in results):
+        return 0
+    return args.unchanged_exit_code
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
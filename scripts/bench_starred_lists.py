@@ -0,0 +1,467 @@
+#!/usr/bin/env python3
+"""Benchmark the stars sync and UI import pipelines against a local fake GitHub."""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import math
+import multiprocessing
+import resource
+import subprocess
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qs, urlparse
+
+import import_starred_lists_from_ui as importer
+import sync_starred_lists as sync
+import stars_http
+from stars_http import ConnectionPool, RequestScheduler
+from stars_search import build_search_index
+
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+DEFAULT_TOLERANCE = 0.25
+DEFAULT_MIN_SLOWDOWN = 0.01
+USERNAME = "bench-user"
+LIST_PAGE_SIZE = 30
+REPOS_PER_LIST = 1_000
+LANGUAGES = ["Go", "Python", "Rust", "TypeScript", "C", "C++", "Java", "Shell", "Ruby", "Zig", "Lua", None]
+TOPICS = [f"topic-{index}" for index in range(60)]
+NAV_LINKS = [
+    "/features", "/pricing", "/login", "/signup", "/about", "/explore", "/marketplace",
+    "/topics", "/trending", "/collections", "/sponsors", "/enterprise", "/security",
+    "/customer-stories", "/resources", "/team", "/site/terms", "/site/privacy",
+]
+STARRED_AT_ORIGIN = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def synthetic_repo(index: int) -> dict[str, Any]:
+    owner, name = repo_full_name(index).split("/")
+    starred_at = STARRED_AT_ORIGIN - timedelta(minutes=index)
+    return {
+        "starred_at": starred_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "repo": {
+            "id": 10_000_000 + index,
+            "node_id": f"R_{index:012d}",
+            "name": name,
+            "full_name": f"{owner}/{name}",
+            "private": False,
+            "owner": {"login": owner, "id": index % 997, "type": "User"},
+            "html_url": f"https://github.com/{owner}/{name}",
+            "description": f"Synthetic repository number {index} used for benchmarks",
+            "fork": index % 17 == 0,
+            "url": f"https://api.github.com/repos/{owner}/{name}",
+            "created_at": "2020-01-01T00:00:00Z",
+            "updated_at": "2026-01-01T00:00:00Z",
+            "pushed_at": "2026-01-01T00:00:00Z",
+            "homepage": None,
+            "size": index % 5000,
+            "stargazers_count": (index * 37) % 50_000,
+            "watchers_count": (index * 37) % 50_000,
+            "language": LANGUAGES[index % len(LANGUAGES)],
+            "forks_count": (index * 7) % 3_000,
+            "archived": index % 23 == 0,
+            "open_issues_count": index % 40,
+            "license": {"key": "mit", "name": "MIT License", "spdx_id": "MIT"},
+            "topics": [TOPICS[(index + offset) % len(TOPICS)] for offset in (0, 7, 19)],
+            "visibility": "public",
+            "default_branch": "main",
+        },
+    }
+
+
+def list_count(size: int) -> int:
+    return max(5, size // REPOS_PER_LIST)
+
+
+def list_slug(index: int) -> str:
+    return f"bench-list-{index}"
+
+
+def repo_full_name(index: int) -> str:
+    return f"owner{index % 997}/repo-{index}"
+
+
+def list_members(size: int) -> list[list[int]]:
+    # Roughly 70% of stars land in one list and every 50th star in a second one.
+    lists = list_count(size)
+    members: list[list[int]] = [[] for _ in range(lists)]
+    for index in range(size):
+        assigned = index % lists if index % 10 < 7 else None
+        if assigned is not None:
+            members[assigned].append(index)
+        if index % 50 == 0 and (index // 50) % lists != assigned:
+            members[(index // 50) % lists].append(index)
+    return members
+
+
+def build_mapping(size: int) -> dict[str, Any]:
+    return {
+        "username": USERNAME,
+        "unlisted": {"slug": "to-classify", "name": "To Classify", "description": ""},
+        "lists": [
+            {
+                "slug": list_slug(list_index),
+                "name": f"Bench List {list_index}",
+                "description": "",
+                "repos": [repo_full_name(index) for index in members],
+            }
+            for list_index, members in enumerate(list_members(size))
+        ],
+    }
+
+
+def html_document(links: list[str]) -> str:
+    nav = "".join(f'<a href="{href}">{href.strip("/")}</a>' for href in NAV_LINKS)
+    return f"<!DOCTYPE html><html><head><title>Stars</title></head><body><nav>{nav}</nav>{''.join(links)}</body></html>"
+
+
+def stars_page_html(members: list[list[int]]) -> str:
+    links = [
+        f'<a href="/stars/{USERNAME}/lists/{list_slug(list_index)}">'
+        f'<h3>Bench List {list_index}</h3><div>{len(list_repos)} repositories</div></a>'
+        for list_index, list_repos in enumerate(members)
+    ]
+    return html_document(links)
+
+
+def list_page_html(members: list[int], list_index: int, page: int) -> str:
+    start = (page - 1) * LIST_PAGE_SIZE
+    links: list[str] = []
+    for index in members[start:start + LIST_PAGE_SIZE]:
+        full_name = repo_full_name(index)
+        links.append(
+            f'<div class="col-12 d-block"><h3><a href="/{full_name}">{full_name}</a></h3>'
+            f'<p>Synthetic repository number {index}</p>'
+            f'<a href="/{full_name}/stargazers">Stars</a><a href="/{full_name}/forks">Forks</a>'
+            f'<a href="/topics/{TOPICS[index % len(TOPICS)]}">{TOPICS[index % len(TOPICS)]}</a></div>'
+        )
+    if start + LIST_PAGE_SIZE < len(members):
+        links.append(f'<a rel="next" href="/stars/{USERNAME}/lists/{list_slug(list_index)}?page={page + 1}">Next</a>')
+    return html_document(links)
+
+
+class FakeGitHub(ThreadingHTTPServer):
+    """Serve synthetic API and HTML pages; API and web UI paths do not overlap."""
+
+    daemon_threads = True
+
+    def __init__(self, size: int) -> None:
+        super().__init__(("127.0.0.1", 0), FakeGitHubHandler)
+        self.size = size
+        self.members = list_members(size)
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def count_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without this, keep-alive
+    # requests stall on Nagle's algorithm and delayed ACKs.
+    disable_nagle_algorithm = True
+    server: FakeGitHub
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        return
+
+    def do_GET(self) -> None:  # noqa: N802
+        parsed = urlparse(self.path)
+        if parsed.path == "/__requests":
+            self._send(str(self.server.requests).encode("utf-8"), "text/plain")
+            return
+
+        self.server.count_request()
+        query = parse_qs(parsed.query)
+        parts = parsed.path.strip("/").split("/")
+        size = self.server.size
+
+        if len(parts) == 3 and parts[0] == "users" and parts[2] == "starred":
+            per_page = int(query.get("per_page", ["30"])[0])
+            page = int(query.get("page", ["1"])[0])
+            items = [synthetic_repo(index) for index in range((page - 1) * per_page, min(size, page * per_page))]
+            last_page = max(1, math.ceil(size / per_page))
+            link = f'<https://api.github.com/users/{USERNAME}/starred?per_page={per_page}&page={last_page}>; rel="last"'
+            self._send(json.dumps(items).encode("utf-8"), "application/json", {"Link": link})
+        elif parts == [USERNAME]:
+            self._send(stars_page_html(self.server.members).encode("utf-8"), "text/html")
+        elif len(parts) == 4 and parts[0] == "stars" and parts[3].startswith("bench-list-"):
+            list_index = int(parts[3].rsplit("-", 1)[1])
+            page = int(query.get("page", ["1"])[0])
+            members = self.server.members[list_index]
+            self._send(list_page_html(members, list_index, page).encode("utf-8"), "text/html")
+        else:
+            self._send(b"Not Found", "text/plain", status=404)
+
+    def _send(self, body: bytes, content_type: str, headers: dict[str, str] | None = None, status: int = 200) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class LocalPool(ConnectionPool):
+    """Connection pool that sends every host to the fake GitHub server over plain HTTP."""
+
+    def __init__(self, port: int, max_idle_per_host: int) -> None:
+        super().__init__(max_idle_per_host=max_idle_per_host)
+        self.port = port
+
+    def connect(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        return http.client.HTTPConnection("127.0.0.1", self.port, timeout=self.timeout)
+
+
+def serve_fake_github(size: int, ports: Any) -> None:
+    server = FakeGitHub(size)
+    ports.put(server.server_address[1])
+    server.serve_forever()
+
+
+def server_request_count(pool: ConnectionPool) -> int:
+    return int(pool.request("http://127.0.0.1/__requests", {}).body)
+
+
+@contextmanager
+def stage(timings: dict[str, float], name: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = round(time.perf_counter() - started, 4)
+
+
+def run_scenario(size: int, concurrency: int) -> dict[str, Any]:
+    # The fake server runs in its own process so its CPU time and memory stay out of the numbers.
+    ports: Any = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve_fake_github, args=(size, ports), daemon=True)
+    server.start()
+    pool = LocalPool(ports.get(timeout=60), max_idle_per_host=concurrency)
+    # Pacing protects GitHub, not the local fake; leave it out of the measurements.
+    stars_http.SCHEDULER = RequestScheduler(max_rps=0)
+    mapping = build_mapping(size)
+    timings: dict[str, float] = {}
+    requests: dict[str, int] = {}
+    started = time.perf_counter()
+
+    try:
+        with stage(timings, "sync.fetch_all_starred_repos"):
+            starred_repos = sync.fetch_all_starred_repos(USERNAME, None, concurrency, None, pool)
+        requests["sync"] = server_request_count(pool)
+
+        raw_items = [synthetic_repo(index) for index in range(size)]
+        with stage(timings, "sync.normalize_repo"):
+            for item in raw_items:
+                sync.normalize_repo(item)
+        del raw_items
+
+        with stage(timings, "sync.build_grouped_dataset"):
+            dataset, _ = sync.build_grouped_dataset(mapping, starred_repos)
+        with stage(timings, "sync.build_search_index"):
+            build_search_index(dataset)
+
+        stars_page_url = f"{importer.GITHUB_ORIGIN}/{USERNAME}?tab=stars"
+        stars_html = importer.fetch_html(stars_page_url, None, None, pool)
+        with stage(timings, "import.parse_anchors"):
+            anchors = importer.parse_list_anchors(stars_html)
+        with stage(timings, "import.extract_list_links"):
+            list_links = importer.extract_list_links(USERNAME, stars_page_url, anchors)
+
+        first_list_url = list_links[0]["url"]
+        page_html = importer.fetch_html(first_list_url, None, None, pool)
+        page_anchors = importer.parse_anchors(page_html)
+        with stage(timings, "import.extract_repo_full_names"):
+            for _ in range(100):
+                importer.extract_repo_full_names(page_anchors, first_list_url)
+        with stage(timings, "import.parse_list_page"):
+            for _ in range(100):
+                page_parser = importer.ListPageParser(first_list_url)
+                page_parser.feed(page_html)
+                page_parser.close()
+
+        requests_before_lists = server_request_count(pool)
+        fingerprints: dict[str, Any] = {}
+        with stage(timings, "import.fetch_list_repos"):
+            for list_info in list_links:
+                _, fingerprints[list_info["url"]], _ = importer.fetch_list_repos(
+                    list_info["url"], None, 10_000, None, pool, list_info["count"]
+                )
+        requests["import"] = server_request_count(pool) - requests_before_lists
+
+        # A second import with the recorded fingerprints, as in a run where no list changed.
+        requests_before_lists = server_request_count(pool)
+        with stage(timings, "import.fetch_list_repos_unchanged"):
+            for list_info in list_links:
+                importer.fetch_list_repos(
+                    list_info["url"], None, 10_000, None, pool, list_info["count"], fingerprints[list_info["url"]]
+                )
+        requests["import_unchanged"] = server_request_count(pool) - requests_before_lists
+    finally:
+        pool.close()
+        server.terminate()
+        server.join()
+
+    return {
+        "size": size,
+        "repos": len(starred_repos),
+        "lists": len(list_links),
+        "wall_time": round(time.perf_counter() - started, 4),
+        "requests": requests,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "stages": timings,
+    }
+
+
+def run_isolated(size: int, concurrency: int) -> dict[str, Any]:
+    # Each size runs in its own interpreter so peak RSS is not inherited from a larger run.
+    command = [sys.executable, str(Path(__file__).resolve()), "--scenario", str(size), "--concurrency", str(concurrency)]
+    completed = subprocess.run(command, check=True, capture_output=True, text=True)
+    return json.loads(completed.stdout)
+
+
+def compare_with_baseline(
+    results: list[dict[str, Any]], baseline: dict[str, Any], tolerance: float, min_slowdown: float
+) -> list[str]:
+    regressions: list[str] = []
+    baseline_by_size = {str(entry.get("size")): entry for entry in baseline.get("results", []) if isinstance(entry, dict)}
+    for result in results:
+        previous = baseline_by_size.get(str(result["size"]))
+        if previous is None:
+            continue
+        label = f"size={result['size']}"
+
+        # Timings also need an absolute slowdown above min_slowdown; a few milliseconds of
+        # scheduler noise on a sub-10 ms stage would otherwise trip the relative tolerance.
+        checks: list[tuple[str, float, float, float]] = [
+            ("wall_time", result["wall_time"], previous.get("wall_time", 0), min_slowdown),
+            ("peak_rss_kb", result["peak_rss_kb"], previous.get("peak_rss_kb", 0), 0),
+        ]
+        for name, seconds in result["stages"].items():
+            checks.append((f"stages.{name}", seconds, (previous.get("stages") or {}).get(name, 0), min_slowdown))
+        for name, current, reference, floor in checks:
+            if reference and current > reference * (1 + tolerance) and current - reference > floor:
+                regressions.append(f"{label} {name}: {current} > {reference} (+{tolerance:.0%} allowed)")
+
+        for name, count in result["requests"].items():
+            reference = (previous.get("requests") or {}).get(name)
+            if isinstance(reference, int) and count > reference:
+                regressions.append(f"{label} requests.{name}: {count} > {reference}")
+    return regressions
+
+
+def parse_sizes(value: str) -> list[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the stars sync/import pipelines against a local fake GitHub server."
+    )
+    parser.add_argument(
+        "--sizes",
+        type=parse_sizes,
+        default=DEFAULT_SIZES,
+        help="Comma-separated synthetic star counts (default: 1000,10000,100000).",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=sync.DEFAULT_CONCURRENCY,
+        help=f"Parallel API page requests during the sync stage (default: {sync.DEFAULT_CONCURRENCY}).",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="Write the benchmark results JSON to this path.",
+    )
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        default=None,
+        help="Compare results against this baseline JSON and exit non-zero on regressions.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help=f"Allowed relative slowdown against the baseline (default: {DEFAULT_TOLERANCE}).",
+    )
+    parser.add_argument(
+        "--min-slowdown",
+        type=float,
+        default=DEFAULT_MIN_SLOWDOWN,
+        help=(
+            "Ignore timing regressions smaller than this many seconds, whatever the relative "
+            f"slowdown (default: {DEFAULT_MIN_SLOWDOWN})."
+        ),
+    )
+    parser.add_argument("--scenario", type=int, default=None, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    concurrency = max(1, args.concurrency)
+
+    if args.scenario is not None:
+        print(json.dumps(run_scenario(args.scenario, concurrency)))
+        return 0
+
+    results: list[dict[str, Any]] = []
+    for size in args.sizes:
+        result = run_isolated(size, concurrency)
+        results.append(result)
+        requests = ", ".join(f"{name}={count}" for name, count in result["requests"].items())
+        print(
+            f"{size} stars: {result['wall_time']:.2f}s wall, {requests} requests, "
+            f"{result['peak_rss_kb'] / 1024:.1f} MiB peak RSS"
+        )
+        for name, seconds in result["stages"].items():
+            print(f"  {name}: {seconds:.4f}s")
+
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "concurrency": concurrency,
+        "results": results,
+    }
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with args.output.open("w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+            handle.write("\n")
+        print(f"Wrote benchmark results to {args.output}.")
+
+    if args.baseline:
+        if not args.baseline.exists():
+            print(f"Baseline file not found: {args.baseline}", file=sys.stderr)
+            return 1
+        with args.baseline.open("r", encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        regressions = compare_with_baseline(results, baseline, args.tolerance, args.min_slowdown)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"No regressions against {args.baseline}.")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -4,20 +4,49 @@
 from __future__ import annotations
 
 import argparse
+import codecs
+import hashlib
 import json
+import math
 import os
 import re
 import sys
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from functools import lru_cache
 from html.parser import HTMLParser
 from pathlib import Path
 from typing import Any
 from urllib.error import HTTPError, URLError
 from urllib.parse import parse_qs, quote, urlencode, urljoin, urlparse, urlunparse
-from urllib.request import Request, urlopen
+
+from stars_http import (
+    ConnectionPool,
+    DeadlineExceeded,
+    ResponseCache,
+    add_cache_arguments,
+    add_scheduler_arguments,
+    cache_from_args,
+    configure_scheduler,
+    fetch,
+    fetch_stream,
+)
+from stars_freshness import add_freshness_arguments, fresh_run_age, record_run
+from stars_metrics import METRICS, add_metrics_arguments, instrumented_run
+from stars_output import content_hash, write_file_atomic
+from stars_store import StarStore, add_store_arguments, store_from_args
 
 
 DEFAULT_MAPPING_PATH = Path("data/starred-lists.json")
+DEFAULT_LIST_FINGERPRINTS_PATH = Path(".cache/starred-lists/list-fingerprints.json")
+LIST_FINGERPRINTS_VERSION = 1
+DEFAULT_LIST_RECONCILE_HOURS = 24.0
+LIST_PAGE_SIZE = 30
 USER_AGENT = "starred-lists-ui-import/1.0"
+DEFAULT_WORKERS = 4
+HREF_CACHE_SIZE = 8192
+NAME_CACHE_SIZE = 1024
 GITHUB_ORIGIN = "https://github.com"
 BLOCKED_OWNERS = {
     "about",
@@ -62,6 +91,17 @@ BLOCKED_OWNERS = {
     "why-github",
 }
 REPO_PATH_RE = re.compile(r"^/([A-Za-z0-9_.-]+)/([A-Za-z0-9_.-]+)$")
+SLUG_SEPARATOR_RE = re.compile(r"[^a-z0-9]+")
+SLUG_DASHES_RE = re.compile(r"-{2,}")
+LIST_COUNT_SUFFIX_RE = re.compile(r"\s+\d+\s+repositor(?:y|ies)\s*$", re.IGNORECASE)
+LIST_REPO_COUNT_RE = re.compile(r"\s+(\d[\d,]*)\s+repositor(?:y|ies)\s*$", re.IGNORECASE)
+TRAILING_NUMBER_RE = re.compile(r"\s*\(?\d+\)?\s*$")
+# Root-relative hrefs without dot segments, empty segments or an empty query, which
+# urljoin leaves untouched; group 1 is set when a query or fragment follows.
+SIMPLE_HREF_RE = re.compile(
+    r"/(?:[A-Za-z0-9_-][A-Za-z0-9_.-]*(?:/[A-Za-z0-9_-][A-Za-z0-9_.-]*)*/?)?([?#][^?#\s].*)?",
+    re.DOTALL,
+)
 
 
 class AnchorParser(HTMLParser):
@@ -74,18 +114,25 @@ class AnchorParser(HTMLParser):
         self._current_attrs: dict[str, str] = {}
         self._current_text: list[str] = []
 
+    def wants_href(self, href: str) -> bool:
+        """Return whether an anchor with this href is worth materializing."""
+        return True
+
     def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
         if tag != "a":
             return
-        attrs_dict = {
+        href = None
+        for key, value in attrs:
+            if key == "href":
+                href = value
+        # Anchors the subclass does not want are dropped before their attrs are copied.
+        if not href or not self.wants_href(href):
+            return
+        self._current_href = href
+        self._current_attrs = {
             key: (value if value is not None else "")
             for key, value in attrs
         }
-        href = attrs_dict.get("href")
-        if not href:
-            return
-        self._current_href = href
-        self._current_attrs = attrs_dict
         self._current_text = []
 
     def handle_data(self, data: str) -> None:
@@ -96,7 +143,7 @@ class AnchorParser(HTMLParser):
         if tag != "a" or self._current_href is None:
             return
         text = " ".join("".join(self._current_text).split())
-        self.anchors.append(
+        self.handle_anchor(
             {
                 "href": self._current_href,
                 "text": text,
@@ -107,53 +154,180 @@ class AnchorParser(HTMLParser):
         self._current_attrs = {}
         self._current_text = []
 
+    def handle_anchor(self, anchor: dict[str, Any]) -> None:
+        self.anchors.append(anchor)
+
+
+class ListLinkParser(AnchorParser):
+    """Collect only the anchors of a stars page that can link to a list."""
+
+    def wants_href(self, href: str) -> bool:
+        # normalize_list_url needs "/lists/" in the path or a "list" query key,
+        # which may be percent-encoded.
+        return "list" in href or "%" in href
+
+
+class ListPageParser(HTMLParser):
+    """Extract repo names and the next page link while a list page streams in.
 
+    Each href is classified as soon as its tag is parsed, so the many navigation
+    links on a page cost neither an attrs dict nor a URL parse. Anchor text is
+    only followed while it can still spell "next".
+    """
+
+    def __init__(self, base_url: str) -> None:
+        super().__init__()
+        self.base_url = base_url
+        self.repos: set[str] = set()
+        self.next_url: str | None = None
+        self._next_href: str | None = None
+        self._next_text: list[str] = []
+        self._next_chars = 0
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if tag != "a":
+            return
+        href = rel = None
+        for key, value in attrs:
+            if key == "href":
+                href = value
+            elif key == "rel":
+                rel = value
+        if not href:
+            return
+        self._next_href = None
+
+        repo = repo_full_name_from_href(href, self.base_url)
+        if repo:
+            self.repos.add(repo)
+
+        if self.next_url is not None:
+            return
+        if rel and "next" in rel.lower().split():
+            self.next_url = next_page_url_from_href(href, self.base_url)
+        else:
+            self._next_href = href
+            self._next_text = []
+            self._next_chars = 0
+
+    def handle_data(self, data: str) -> None:
+        if self._next_href is None:
+            return
+        # Normalized "next" has four non-space characters; anything longer cannot match.
+        self._next_chars += len("".join(data.split()))
+        if self._next_chars > 4:
+            self._next_href = None
+        else:
+            self._next_text.append(data)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag != "a" or self._next_href is None:
+            return
+        if "".join(self._next_text).strip().lower() == "next":
+            self.next_url = next_page_url_from_href(self._next_href, self.base_url)
+        self._next_href = None
+
+
+@lru_cache(maxsize=NAME_CACHE_SIZE)
 def slugify(value: str) -> str:
     lowered = value.strip().lower()
-    lowered = re.sub(r"[^a-z0-9]+", "-", lowered)
-    lowered = re.sub(r"-{2,}", "-", lowered)
+    lowered = SLUG_SEPARATOR_RE.sub("-", lowered)
+    lowered = SLUG_DASHES_RE.sub("-", lowered)
     return lowered.strip("-")
 
 
+@lru_cache(maxsize=NAME_CACHE_SIZE)
 def clean_list_name(raw_name: str, fallback: str) -> str:
     name = " ".join(raw_name.split())
     if not name:
         name = fallback.replace("-", " ")
-    name = re.sub(r"\s+\d+\s+repositor(?:y|ies)\s*$", "", name, flags=re.IGNORECASE).strip()
-    name = re.sub(r"\s*\(?\d+\)?\s*$", "", name).strip()
+    name = LIST_COUNT_SUFFIX_RE.sub("", name).strip()
+    name = TRAILING_NUMBER_RE.sub("", name).strip()
     return name or fallback.replace("-", " ")
 
 
+@lru_cache(maxsize=NAME_CACHE_SIZE)
+def list_repo_count(raw_name: str) -> int | None:
+    """Return the repository count GitHub shows after a list's name, if the link text has one."""
+    match = LIST_REPO_COUNT_RE.search(" ".join(raw_name.split()))
+    return int(match.group(1).replace(",", "")) if match else None
+
+
 def read_json(path: Path) -> Any:
     with path.open("r", encoding="utf-8") as handle:
         return json.load(handle)
 
 
+def encode_mapping(payload: Any) -> bytes:
+    """Return the exact bytes write_json stores for a mapping."""
+    return (json.dumps(payload, indent=2) + "\n").encode("utf-8")
+
+
 def write_json(path: Path, payload: Any) -> None:
-    with path.open("w", encoding="utf-8") as handle:
-        json.dump(payload, handle, indent=2)
-        handle.write("\n")
+    with path.open("wb") as handle:
+        handle.write(encode_mapping(payload))
 
 
-def fetch_html(url: str, cookie: str | None) -> str:
+def html_request_headers(cookie: str | None) -> dict[str, str]:
     headers = {
         "Accept": "text/html,application/xhtml+xml",
         "User-Agent": USER_AGENT,
     }
     if cookie:
         headers["Cookie"] = cookie
-
-    request = Request(url, headers=headers)
-    with urlopen(request) as response:  # noqa: S310
-        return response.read().decode("utf-8", errors="replace")
+    return headers
+
+
+def fetch_html(
+    url: str,
+    cookie: str | None,
+    cache: ResponseCache | None = None,
+    pool: ConnectionPool | None = None,
+) -> str:
+    with METRICS.stage("fetch_html"):
+        return fetch(url, html_request_headers(cookie), cache, pool).body.decode("utf-8", errors="replace")
+
+
+def fetch_list_page(
+    url: str,
+    cookie: str | None,
+    cache: ResponseCache | None = None,
+    pool: ConnectionPool | None = None,
+) -> tuple[set[str], str | None]:
+    """Stream a list page through ListPageParser without buffering the HTML."""
+    parser = ListPageParser(url)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    with METRICS.stage("fetch_list_page"):
+        for chunk in fetch_stream(url, html_request_headers(cookie), cache, pool):
+            with METRICS.stage("parse_anchors"):
+                parser.feed(decoder.decode(chunk))
+        with METRICS.stage("parse_anchors"):
+            parser.feed(decoder.decode(b"", final=True))
+            parser.close()
+    return parser.repos, parser.next_url
 
 
 def parse_anchors(html: str) -> list[dict[str, Any]]:
-    parser = AnchorParser()
-    parser.feed(html)
-    return parser.anchors
+    with METRICS.stage("parse_anchors"):
+        parser = AnchorParser()
+        parser.feed(html)
+        return parser.anchors
+
+
+def parse_list_anchors(html: str) -> list[dict[str, Any]]:
+    """Like parse_anchors, but only keep anchors that extract_list_links can use."""
+    with METRICS.stage("parse_anchors"):
+        parser = ListLinkParser()
+        parser.feed(html)
+        return parser.anchors
 
 
+@lru_cache(maxsize=64)
+def list_path_re(username: str) -> re.Pattern[str]:
+    return re.compile(rf"^/stars/{re.escape(username)}/lists/([^/]+)$")
+
+
+@lru_cache(maxsize=HREF_CACHE_SIZE)
 def normalize_list_url(username: str, href: str, base_url: str) -> tuple[str | None, str | None]:
     url = urljoin(base_url, href)
     parsed = urlparse(url)
@@ -175,7 +349,7 @@ def normalize_list_url(username: str, href: str, base_url: str) -> tuple[str | N
         else:
             return None, None
     else:
-        match = re.match(rf"^/stars/{re.escape(username)}/lists/([^/]+)$", path)
+        match = list_path_re(username).match(path)
         if not match:
             return None, None
         list_token = match.group(1)
@@ -189,8 +363,8 @@ def normalize_list_url(username: str, href: str, base_url: str) -> tuple[str | N
     return normalized, list_token
 
 
-def extract_list_links(username: str, stars_page_url: str, anchors: list[dict[str, Any]]) -> list[dict[str, str]]:
-    candidates: dict[str, dict[str, str]] = {}
+def extract_list_links(username: str, stars_page_url: str, anchors: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    candidates: dict[str, dict[str, Any]] = {}
     for anchor in anchors:
         href = str(anchor.get("href") or "").strip()
         if not href:
@@ -200,93 +374,213 @@ def extract_list_links(username: str, stars_page_url: str, anchors: list[dict[st
             continue
 
         fallback_name = list_token.replace("-", " ").replace("_", " ")
-        name = clean_list_name(str(anchor.get("text") or ""), fallback_name)
+        text = str(anchor.get("text") or "")
+        name = clean_list_name(text, fallback_name)
         slug = slugify(list_token) or slugify(name) or "list"
 
         candidates[normalized_url] = {
             "name": name,
             "slug": slug,
             "url": normalized_url,
+            "count": list_repo_count(text),
         }
 
     return sorted(candidates.values(), key=lambda item: item["name"].lower())
 
 
+def repo_full_name_from_path(path: str) -> str | None:
+    match = REPO_PATH_RE.match(path)
+    if not match:
+        return None
+    owner, repo = match.group(1), match.group(2)
+    if owner.lower() in BLOCKED_OWNERS:
+        return None
+    return f"{owner}/{repo}"
+
+
+def repo_full_name_from_href(href: str, base_url: str) -> str | None:
+    # A root-relative href resolves the same on every github.com page, so those
+    # share one cache entry across pages and lists.
+    if href[:1] == "/" and href[1:2] != "/" and base_url.startswith(f"{GITHUB_ORIGIN}/"):
+        base_url = GITHUB_ORIGIN
+    return resolve_repo_full_name(href, base_url)
+
+
+@lru_cache(maxsize=HREF_CACHE_SIZE)
+def resolve_repo_full_name(href: str, base_url: str) -> str | None:
+    if base_url == GITHUB_ORIGIN:
+        simple = SIMPLE_HREF_RE.fullmatch(href)
+        if simple is not None:
+            # A plain root-relative path resolves to itself, so skip urljoin.
+            return None if simple.group(1) else repo_full_name_from_path(href)
+    href = href.strip()
+    if not href:
+        return None
+    url = urljoin(base_url, href)
+    parsed = urlparse(url)
+    if parsed.netloc != "github.com":
+        return None
+    if parsed.query or parsed.fragment:
+        return None
+    return repo_full_name_from_path(parsed.path)
+
+
+def repo_full_name_from_anchor(anchor: dict[str, Any], base_url: str) -> str | None:
+    return repo_full_name_from_href(str(anchor.get("href") or ""), base_url)
+
+
 def extract_repo_full_names(anchors: list[dict[str, Any]], base_url: str) -> set[str]:
     repos: set[str] = set()
     for anchor in anchors:
-        href = str(anchor.get("href") or "").strip()
-        if not href:
-            continue
-        url = urljoin(base_url, href)
-        parsed = urlparse(url)
-        if parsed.netloc != "github.com":
-            continue
-        if parsed.query or parsed.fragment:
-            continue
-        match = REPO_PATH_RE.match(parsed.path)
-        if not match:
-            continue
-        owner, repo = match.group(1), match.group(2)
-        if owner.lower() in BLOCKED_OWNERS:
-            continue
-        repos.add(f"{owner}/{repo}")
+        repo = repo_full_name_from_anchor(anchor, base_url)
+        if repo:
+            repos.add(repo)
     return repos
 
 
+def next_page_url_from_href(href: str, current_url: str) -> str | None:
+    href = href.strip()
+    if not href:
+        return None
+    next_url = urljoin(current_url, href)
+    parsed = urlparse(next_url)
+    if parsed.netloc != "github.com":
+        return None
+    return urlunparse(("https", "github.com", parsed.path, "", parsed.query, ""))
+
+
+def next_page_url_from_anchor(anchor: dict[str, Any], current_url: str) -> str | None:
+    href = str(anchor.get("href") or "")
+    attrs = anchor.get("attrs") or {}
+    rel = str(attrs.get("rel") or "").lower()
+    text = str(anchor.get("text") or "").strip().lower()
+    is_next = ("next" in rel.split()) or (text == "next")
+    if not is_next:
+        return None
+    return next_page_url_from_href(href, current_url)
+
+
 def find_next_page_url(anchors: list[dict[str, Any]], current_url: str) -> str | None:
     for anchor in anchors:
-        href = str(anchor.get("href") or "").strip()
-        if not href:
-            continue
-        attrs = anchor.get("attrs") or {}
-        rel = str(attrs.get("rel") or "").lower()
-        text = str(anchor.get("text") or "").strip().lower()
-        is_next = ("next" in rel.split()) or (text == "next")
-        if not is_next:
-            continue
-
-        next_url = urljoin(current_url, href)
-        parsed = urlparse(next_url)
-        if parsed.netloc != "github.com":
-            continue
-        return urlunparse(("https", "github.com", parsed.path, "", parsed.query, ""))
+        next_url = next_page_url_from_anchor(anchor, current_url)
+        if next_url:
+            return next_url
     return None
 
 
-def fetch_list_repos(list_url: str, cookie: str | None, max_pages: int) -> list[str]:
-    repos: set[str] = set()
-    current_url: str | None = list_url
-    seen_urls: set[str] = set()
-    page_count = 0
+MEMOIZED_HELPERS = {
+    "normalize_list_url": normalize_list_url,
+    "resolve_repo_full_name": resolve_repo_full_name,
+    "slugify": slugify,
+    "clean_list_name": clean_list_name,
+    "list_repo_count": list_repo_count,
+}
+
 
-    while current_url and page_count < max_pages and current_url not in seen_urls:
+@contextmanager
+def recorded_memo_stats() -> Iterator[None]:
+    """Add this run's memo cache hits and misses to the metrics counters and print a summary line."""
+    before = {name: helper.cache_info() for name, helper in MEMOIZED_HELPERS.items()}
+    try:
+        yield
+    finally:
+        parts: list[str] = []
+        for name, helper in MEMOIZED_HELPERS.items():
+            info = helper.cache_info()
+            hits = info.hits - before[name].hits
+            misses = info.misses - before[name].misses
+            METRICS.incr(f"memo_{name}_hits", hits)
+            METRICS.incr(f"memo_{name}_misses", misses)
+            if hits or misses:
+                parts.append(f"{name} {hits}/{hits + misses}")
+        if parts:
+            print(f"Memo cache hits/lookups: {', '.join(parts)}.")
+
+
+def first_page_hash(repos: set[str]) -> str:
+    return hashlib.sha256("\n".join(sorted(repos)).encode("utf-8")).hexdigest()
+
+
+def load_list_fingerprints(path: Path | None) -> dict[str, Any]:
+    if path is None:
+        return {}
+    try:
+        payload = read_json(path)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(payload, dict) or payload.get("version") != LIST_FINGERPRINTS_VERSION:
+        return {}
+    lists = payload.get("lists")
+    return lists if isinstance(lists, dict) else {}
+
+
+def save_list_fingerprints(path: Path | None, fingerprints: dict[str, Any]) -> None:
+    if path is None:
+        return
+    payload = {"version": LIST_FINGERPRINTS_VERSION, "lists": fingerprints}
+    try:
+        write_file_atomic(path, json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+    except OSError as error:
+        print(f"Warning: could not save list fingerprints: {error}", file=sys.stderr)
+
+
+def fetch_list_repos(
+    list_url: str,
+    cookie: str | None,
+    max_pages: int,
+    cache: ResponseCache | None = None,
+    pool: ConnectionPool | None = None,
+    count: int | None = None,
+    previous: Any = None,
+    max_age: float | None = None,
+) -> tuple[list[str], dict[str, Any], bool]:
+    """Scrape a list's repos; return them, the list's fingerprint and whether it was unchanged.
+
+    The fingerprint is the repository count from the list link plus a hash of
+    the first page. When both match ``previous`` and it was paged in full less
+    than max_age seconds ago, the repos recorded with it are reused after
+    fetching that one page. Otherwise the list is paged until there is no next
+    page. Pages also link forks' upstreams and other repos, so the count never
+    ends the walk early; it only raises the max_pages budget to the pages that
+    many repos fill.
+    """
+    first_repos, current_url = fetch_list_page(list_url, cookie, cache, pool)
+    fingerprint: dict[str, Any] = {"count": count, "first_page": first_page_hash(first_repos)}
+    if (
+        count is not None
+        and isinstance(previous, dict)
+        and previous.get("count") == count
+        and previous.get("first_page") == fingerprint["first_page"]
+        and isinstance(previous.get("paged_at"), (int, float))
+        and (max_age is None or time.time() - previous["paged_at"] < max_age)
+        and isinstance(previous.get("repos"), list)
+        and all(isinstance(repo, str) for repo in previous["repos"])
+    ):
+        METRICS.incr("lists_unchanged")
+        return previous["repos"], {**previous, **fingerprint}, True
+
+    page_limit = max_pages if count is None else max(max_pages, math.ceil(count / LIST_PAGE_SIZE) + 1)
+    repos = set(first_repos)
+    seen_urls = {list_url}
+    page_count = 1
+
+    while current_url and page_count < page_limit and current_url not in seen_urls:
         seen_urls.add(current_url)
-        html = fetch_html(current_url, cookie)
-        anchors = parse_anchors(html)
-        repos |= extract_repo_full_names(anchors, current_url)
-        current_url = find_next_page_url(anchors, current_url)
+        page_repos, current_url = fetch_list_page(current_url, cookie, cache, pool)
+        repos |= page_repos
         page_count += 1
 
-    return sorted(repos, key=lambda item: item.lower())
+    if current_url and current_url not in seen_urls:
+        print(
+            f"Warning: stopped paging {list_url} after {page_count} pages; raise --max-pages to import the rest.",
+            file=sys.stderr,
+        )
 
+    result = sorted(repos, key=lambda item: item.lower())
+    return result, {**fingerprint, "paged_at": time.time(), "repos": result}, False
 
-def parse_args() -> argparse.Namespace:
-    parser = argparse.ArgumentParser(
-        description="Import GitHub stars list assignments from GitHub web UI."
-    )
-    parser.add_argument(
-        "--mapping",
-        type=Path,
-        default=DEFAULT_MAPPING_PATH,
-        help=f"Path to mapping JSON file (default: {DEFAULT_MAPPING_PATH})",
-    )
-    parser.add_argument(
-        "--username",
-        type=str,
-        default=None,
-        help="Override GitHub username from mapping file.",
-    )
+
+def add_import_arguments(parser: argparse.ArgumentParser) -> None:
     parser.add_argument(
         "--cookie-env",
         type=str,
@@ -297,73 +591,152 @@ def parse_args() -> argparse.Namespace:
         "--max-pages",
         type=int,
         default=25,
-        help="Max pagination pages per list (default: 25).",
+        help=(
+            "Max pagination pages per list; a list whose link shows a repository count may "
+            f"page further, up to the pages that many repos fill at {LIST_PAGE_SIZE} per page (default: 25)."
+        ),
+    )
+    parser.add_argument(
+        "--list-fingerprints",
+        type=Path,
+        default=DEFAULT_LIST_FINGERPRINTS_PATH,
+        help=(
+            "Where each list's repository count, first page hash and repos are kept, so lists "
+            f"unchanged since the last run are read from one page; --no-cache skips it "
+            f"(default: {DEFAULT_LIST_FINGERPRINTS_PATH})."
+        ),
+    )
+    parser.add_argument(
+        "--list-reconcile-after",
+        type=float,
+        default=DEFAULT_LIST_RECONCILE_HOURS,
+        help=(
+            "Page a list in full again once its last full scrape is older than this many hours, "
+            "even if its fingerprint matches, to catch changes past the first page "
+            f"(default: {DEFAULT_LIST_RECONCILE_HOURS:g})."
+        ),
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Number of lists scraped in parallel (default: {DEFAULT_WORKERS}).",
     )
     parser.add_argument(
         "--preserve-unmatched",
         action="store_true",
         help="Keep local mapping lists that are not present in GitHub UI.",
     )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Import GitHub stars list assignments from GitHub web UI."
+    )
+    parser.add_argument(
+        "--mapping",
+        type=Path,
+        default=DEFAULT_MAPPING_PATH,
+        help=f"Path to mapping JSON file (default: {DEFAULT_MAPPING_PATH})",
+    )
+    parser.add_argument(
+        "--username",
+        type=str,
+        default=None,
+        help="Override GitHub username from mapping file.",
+    )
+    add_import_arguments(parser)
     parser.add_argument(
         "--dry-run",
         action="store_true",
         help="Print what would change without writing the mapping file.",
     )
+    parser.add_argument(
+        "--unchanged-exit-code",
+        type=int,
+        default=0,
+        help=(
+            "Exit status when the mapping content is unchanged and nothing was written, "
+            "e.g. 3 so a pipeline can skip the build and deploy (default: 0)."
+        ),
+    )
+    add_freshness_arguments(parser)
+    add_store_arguments(parser)
+    add_cache_arguments(parser)
+    add_scheduler_arguments(parser)
+    add_metrics_arguments(parser)
     return parser.parse_args()
 
 
 def main() -> int:
     args = parse_args()
+    with instrumented_run("import_starred_lists_from_ui", args), recorded_memo_stats():
+        try:
+            return run(args)
+        except DeadlineExceeded as error:
+            # Never write a mapping that only holds the lists imported before the deadline.
+            print(f"Import aborted: {error}.", file=sys.stderr)
+            return 1
 
-    if not args.mapping.exists():
-        print(f"Mapping file not found: {args.mapping}", file=sys.stderr)
-        return 1
 
-    mapping = read_json(args.mapping)
-    if not isinstance(mapping, dict):
-        print("Mapping file must be a JSON object.", file=sys.stderr)
-        return 1
+class ListImportError(RuntimeError):
+    """The stars page could not be read or no list could be imported."""
 
-    username = args.username or mapping.get("username")
-    if not isinstance(username, str) or not username.strip():
-        print("GitHub username is required in mapping file or --username.", file=sys.stderr)
-        return 1
-    username = username.strip()
-
-    cookie = None
-    if args.cookie_env:
-        cookie = os.environ.get(args.cookie_env)
 
+def scrape_lists(
+    args: argparse.Namespace,
+    username: str,
+    cookie: str | None,
+    cache: ResponseCache | None,
+    pool: ConnectionPool | None,
+) -> tuple[list[dict[str, Any]], list[tuple[str, str]]]:
+    """Scrape every list on the stars page; return the imported lists and the failed ones."""
     stars_page_url = f"{GITHUB_ORIGIN}/{username}?tab=stars"
     try:
-        stars_html = fetch_html(stars_page_url, cookie)
+        stars_html = fetch_html(stars_page_url, cookie, cache, pool)
     except HTTPError as error:
-        print(f"Failed to fetch stars page: HTTP {error.code}", file=sys.stderr)
-        return 1
+        raise ListImportError(f"Failed to fetch stars page: HTTP {error.code}") from error
     except URLError as error:
-        print(f"Failed to fetch stars page: {error}", file=sys.stderr)
-        return 1
+        raise ListImportError(f"Failed to fetch stars page: {error}") from error
 
     if "Sign in to GitHub" in stars_html and "/login" in stars_html:
-        print(
-            "GitHub returned a sign-in page. If your stars are private, set GITHUB_COOKIE and retry.",
-            file=sys.stderr,
+        raise ListImportError(
+            "GitHub returned a sign-in page. If your stars are private, set GITHUB_COOKIE and retry."
         )
-        return 1
 
-    list_links = extract_list_links(username, stars_page_url, parse_anchors(stars_html))
+    list_links = extract_list_links(username, stars_page_url, parse_list_anchors(stars_html))
     if not list_links:
-        print(
-            "No GitHub star lists found in the stars page UI. Ensure lists exist and are visible.",
-            file=sys.stderr,
+        raise ListImportError(
+            "No GitHub star lists found in the stars page UI. Ensure lists exist and are visible."
         )
-        return 1
 
+    fingerprints_path = None if args.no_cache else args.list_fingerprints
+    fingerprints = load_list_fingerprints(fingerprints_path)
     scraped_lists: list[dict[str, Any]] = []
     failed_lists: list[tuple[str, str]] = []
-    for list_info in list_links:
+    unchanged_lists = 0
+    # Lists are scraped in parallel; pagination inside a list stays sequential
+    # because each next page URL comes from the previous page.
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        futures = [
+            executor.submit(
+                fetch_list_repos,
+                list_info["url"],
+                cookie,
+                args.max_pages,
+                cache,
+                pool,
+                list_info["count"],
+                fingerprints.get(list_info["url"]),
+                args.list_reconcile_after * 3600,
+            )
+            for list_info in list_links
+        ]
+    for list_info, future in zip(list_links, futures):
         try:
-            repos = fetch_list_repos(list_info["url"], cookie, args.max_pages)
+            repos, fingerprints[list_info["url"]], unchanged = future.result()
         except HTTPError as error:
             failed_lists.append((list_info["name"], f"HTTP {error.code}"))
             print(
@@ -385,14 +758,35 @@ def main() -> int:
                 "name": list_info["name"],
                 "description": "",
                 "repos": repos,
+                "url": list_info["url"],
             }
         )
-        print(f"Imported {len(repos)} repos from list '{list_info['name']}'.")
+        unchanged_lists += unchanged
+        suffix = ", unchanged since the last run" if unchanged else ""
+        print(f"Imported {len(repos)} repos from list '{list_info['name']}'{suffix}.")
 
     if not scraped_lists:
-        print("No lists could be imported from GitHub UI.", file=sys.stderr)
-        return 1
-
+        raise ListImportError("No lists could be imported from GitHub UI.")
+    if unchanged_lists:
+        print(f"{unchanged_lists} list(s) matched their last fingerprint and were read from one page.")
+    save_list_fingerprints(fingerprints_path, fingerprints)
+    return scraped_lists, failed_lists
+
+
+def store_scraped_lists(store: StarStore, username: str, scraped_lists: list[dict[str, Any]]) -> None:
+    # Lists that failed to import keep their previously stored members.
+    with METRICS.stage("store_write"):
+        for entry in scraped_lists:
+            store.replace_list(username, entry["slug"], entry["name"], entry["url"], entry["repos"])
+
+
+def merge_scraped_lists(
+    mapping: dict[str, Any],
+    username: str,
+    scraped_lists: list[dict[str, Any]],
+    preserve_unmatched: bool,
+) -> None:
+    """Replace the mapping's lists with the scraped ones, keeping local descriptions."""
     existing_lists = mapping.get("lists")
     existing_by_slug: dict[str, dict[str, Any]] = {}
     if isinstance(existing_lists, list):
@@ -418,7 +812,7 @@ def main() -> int:
             }
         )
 
-    if args.preserve_unmatched:
+    if preserve_unmatched:
         for slug, existing in existing_by_slug.items():
             if slug in seen_slugs:
                 continue
@@ -427,17 +821,68 @@ def main() -> int:
     mapping["username"] = username
     mapping["lists"] = merged_lists
 
+
+def run(args: argparse.Namespace) -> int:
+    if not args.mapping.exists():
+        print(f"Mapping file not found: {args.mapping}", file=sys.stderr)
+        return 1
+
+    fresh_age = fresh_run_age(args, "import_starred_lists_from_ui", args.mapping, [args.mapping])
+    if fresh_age is not None:
+        print(f"Last import finished {fresh_age:.0f}s ago and the mapping is unchanged, skipped importing.")
+        return args.unchanged_exit_code
+
+    mapping = read_json(args.mapping)
+    if not isinstance(mapping, dict):
+        print("Mapping file must be a JSON object.", file=sys.stderr)
+        return 1
+    original_hash = content_hash(mapping)
+
+    username = args.username or mapping.get("username")
+    if not isinstance(username, str) or not username.strip():
+        print("GitHub username is required in mapping file or --username.", file=sys.stderr)
+        return 1
+    username = username.strip()
+
+    cookie = None
+    if args.cookie_env:
+        cookie = os.environ.get(args.cookie_env)
+
+    configure_scheduler(args)
+    cache = cache_from_args(args)
+    pool = ConnectionPool(max_idle_per_host=max(1, args.workers))
+    try:
+        scraped_lists, failed_lists = scrape_lists(args, username, cookie, cache, pool)
+    except ListImportError as error:
+        print(error, file=sys.stderr)
+        return 1
+
+    store = None if args.dry_run else store_from_args(args)
+    if store is not None:
+        with store:
+            store_scraped_lists(store, username, scraped_lists)
+
+    merge_scraped_lists(mapping, username, scraped_lists, args.preserve_unmatched)
+
     if args.dry_run:
-        print(f"Dry run complete. Would write {len(merged_lists)} list entries to {args.mapping}.")
+        print(f"Dry run complete. Would write {len(mapping['lists'])} list entries to {args.mapping}.")
         if failed_lists:
             print(f"Skipped {len(failed_lists)} list(s) due fetch errors.", file=sys.stderr)
         return 0
 
-    write_json(args.mapping, mapping)
-    print(f"Updated mapping file: {args.mapping}")
+    unchanged = content_hash(mapping) == original_hash
+    if unchanged:
+        print(f"Mapping file is unchanged, skipped writing {args.mapping}.")
+    else:
+        with METRICS.stage("write_output"):
+            write_json(args.mapping, mapping)
+        print(f"Updated mapping file: {args.mapping}")
     if failed_lists:
         print(f"Skipped {len(failed_lists)} list(s) due fetch errors.", file=sys.stderr)
-    return 0
+    else:
+        # A partial import is not recorded so the next run retries the failed lists.
+        record_run(args, "import_starred_lists_from_ui", args.mapping, [args.mapping])
+    return args.unchanged_exit_code if unchanged else 0
 
 
 if __name__ == "__main__":
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""Import star lists from the GitHub web UI and sync stars into grouped JSON in one run."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+import import_starred_lists_from_ui as importer
+import sync_starred_lists as sync
+from stars_http import (
+    ConnectionPool,
+    add_cache_arguments,
+    add_scheduler_arguments,
+    cache_from_args,
+    configure_scheduler,
+)
+from stars_freshness import add_freshness_arguments, fresh_run_age, record_run
+from stars_metrics import METRICS, add_metrics_arguments, instrumented_run
+from stars_output import content_hash
+from stars_store import add_store_arguments, store_from_args
+
+
+DEFAULT_MAPPING_PATH = sync.DEFAULT_MAPPING_PATH
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Import GitHub stars lists from the web UI and fetch starred repositories at the same "
+            "time, then write the mapping and the grouped JSON once."
+        )
+    )
+    parser.add_argument(
+        "--mapping",
+        type=Path,
+        default=DEFAULT_MAPPING_PATH,
+        help=f"Path to mapping JSON file (default: {DEFAULT_MAPPING_PATH})",
+    )
+    parser.add_argument(
+        "--username",
+        type=str,
+        default=None,
+        help="Override GitHub username from mapping file.",
+    )
+    importer.add_import_arguments(parser)
+    sync.add_sync_arguments(parser)
+    parser.add_argument(
+        "--unchanged-exit-code",
+        type=int,
+        default=0,
+        help=(
+            "Exit status when neither the mapping nor the grouped dataset changed and nothing was "
+            "written, e.g. 3 so a pipeline can skip the build and deploy (default: 0)."
+        ),
+    )
+    add_freshness_arguments(parser)
+    add_store_arguments(parser)
+    add_cache_arguments(parser)
+    add_scheduler_arguments(parser)
+    add_metrics_arguments(parser)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    with instrumented_run("refresh_starred_lists", args), importer.recorded_memo_stats():
+        return run(args)
+
+
+def run(args: argparse.Namespace) -> int:
+    if not args.mapping.exists():
+        print(f"Mapping file not found: {args.mapping}", file=sys.stderr)
+        return 1
+
+    outputs = [args.mapping, *sync.output_paths(args)]
+    fresh_age = fresh_run_age(args, "refresh_starred_lists", args.mapping, outputs)
+    if fresh_age is not None:
+        print(f"Last refresh finished {fresh_age:.0f}s ago and the mapping is unchanged, skipped refreshing.")
+        return args.unchanged_exit_code
+
+    mapping_data = args.mapping.read_bytes()
+    mapping = json.loads(mapping_data)
+    if not isinstance(mapping, dict):
+        print("Mapping file must be a JSON object.", file=sys.stderr)
+        return 1
+    original_hash = content_hash(mapping)
+
+    username = args.username or mapping.get("username")
+    if not isinstance(username, str) or not username.strip():
+        print("GitHub username is required in mapping file or --username.", file=sys.stderr)
+        return 1
+    username = username.strip()
+
+    cookie = os.environ.get(args.cookie_env) if args.cookie_env else None
+    token = os.environ.get(args.token_env)
+    if args.backend == "graphql" and not token:
+        print(f"The GraphQL backend requires a token in ${args.token_env}.", file=sys.stderr)
+        return 1
+    if args.enrich and not token:
+        print(f"--enrich requires a token in ${args.token_env}.", file=sys.stderr)
+        return 1
+
+    configure_scheduler(args)
+    cache = cache_from_args(args)
+    pool = ConnectionPool(max_idle_per_host=max(1, args.workers, args.concurrency))
+    previous = sync.load_previous_output(args)
+    store = store_from_args(args)
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    try:
+        # The UI scrape and the API fetch talk to different hosts, so neither waits on the other.
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            lists_future = executor.submit(importer.scrape_lists, args, username, cookie, cache, pool)
+            starred_repos, last_full_sync_at = sync.sync_stars(args, username, token, cache, pool, previous, store)
+            scraped_lists, failed_lists = lists_future.result()
+        sync.enrich_stars(args, starred_repos, token, pool)
+
+        if store is not None:
+            importer.store_scraped_lists(store, username, scraped_lists)
+        importer.merge_scraped_lists(mapping, username, scraped_lists, args.preserve_unmatched)
+        mapping_changed = content_hash(mapping) != original_hash
+        # Key the mapping index by the file bytes, as a standalone sync of the written mapping would.
+        mapping_hash = sync.mapping_file_hash(importer.encode_mapping(mapping) if mapping_changed else mapping_data)
+        dataset, warnings = sync.build_dataset(args, mapping, mapping_hash, starred_repos, last_full_sync_at)
+    except importer.ListImportError as error:
+        print(error, file=sys.stderr)
+        return 1
+    except Exception as error:  # noqa: BLE001
+        print(f"Failed to refresh stars: {error}", file=sys.stderr)
+        return 1
+    finally:
+        if store is not None:
+            store.close()
+
+    if mapping_changed:
+        with METRICS.stage("write_output"):
+            importer.write_json(args.mapping, mapping)
+        print(f"Updated mapping file: {args.mapping}")
+    else:
+        print(f"Mapping file is unchanged, skipped writing {args.mapping}.")
+    if failed_lists:
+        print(f"Skipped {len(failed_lists)} list(s) due fetch errors.", file=sys.stderr)
+
+    status = sync.write_outputs(args, mapping, dataset, warnings, previous)
+    if not failed_lists and status in (0, args.unchanged_exit_code):
+        record_run(args, "refresh_starred_lists", args.mapping, outputs)
+    if mapping_changed and status == args.unchanged_exit_code:
+        return 0
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,107 @@
+"""Change feed between two consecutive grouped datasets of starred repositories."""
+
+from __future__ import annotations
+
+from typing import Any
+
+
+CHANGE_FEED_VERSION = 1
+TRACKED_FIELDS = ("archived", "stargazers_count", "topics")
+
+
+def repo_value(repo: Any, field: str) -> Any:
+    """Read a field from a dataset repo entry, either a dict or a StarredRepo record."""
+    value = repo.get(field) if isinstance(repo, dict) else getattr(repo, field, None)
+    return list(value) if isinstance(value, tuple) else value
+
+
+def index_dataset(dataset: dict[str, Any]) -> dict[Any, tuple[Any, list[str]]]:
+    """Map each repo id to its entry and the slugs of the groups it appears in, in group order."""
+    index: dict[Any, tuple[Any, list[str]]] = {}
+    for group in dataset.get("groups") or []:
+        if not isinstance(group, dict) or not isinstance(group.get("repos"), list):
+            continue
+        slug = str(group.get("slug", ""))
+        for repo in group["repos"]:
+            repo_id = repo_value(repo, "id")
+            if repo_id is None:
+                continue
+            entry = index.get(repo_id)
+            if entry is None:
+                index[repo_id] = (repo, [slug])
+            elif slug not in entry[1]:
+                entry[1].append(slug)
+    return index
+
+
+def field_changes(previous: Any, current: Any) -> dict[str, Any]:
+    changes: dict[str, Any] = {}
+    for field in TRACKED_FIELDS:
+        before = repo_value(previous, field)
+        after = repo_value(current, field)
+        if field == "topics":
+            before_topics = set(before or [])
+            after_topics = set(after or [])
+            if before_topics != after_topics:
+                changes[field] = {
+                    "added": sorted(after_topics - before_topics),
+                    "removed": sorted(before_topics - after_topics),
+                }
+        elif before != after:
+            changes[field] = {"from": before, "to": after}
+    return changes
+
+
+def sort_entries(entries: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    return sorted(entries, key=lambda entry: (str(entry["full_name"]).lower(), str(entry["id"])))
+
+
+def build_change_feed(previous: dict[str, Any], dataset: dict[str, Any]) -> dict[str, Any]:
+    """Describe what changed from the previous dataset to the new one.
+
+    New stars carry the full repo entry so consumers can index them without
+    reading the dataset; the other sections only name the repo and what changed.
+    """
+    previous_index = index_dataset(previous)
+    current_index = index_dataset(dataset)
+
+    added: list[dict[str, Any]] = []
+    moved: list[dict[str, Any]] = []
+    updated: list[dict[str, Any]] = []
+    for repo_id, (repo, groups) in current_index.items():
+        full_name = repo_value(repo, "full_name")
+        previous_entry = previous_index.get(repo_id)
+        if previous_entry is None:
+            added.append({"id": repo_id, "full_name": full_name, "groups": groups, "repo": repo})
+            continue
+        previous_repo, previous_groups = previous_entry
+        if sorted(previous_groups) != sorted(groups):
+            moved.append({"id": repo_id, "full_name": full_name, "from": previous_groups, "to": groups})
+        changes = field_changes(previous_repo, repo)
+        if changes:
+            updated.append({"id": repo_id, "full_name": full_name, "changes": changes})
+
+    removed = [
+        {"id": repo_id, "full_name": repo_value(repo, "full_name"), "groups": groups}
+        for repo_id, (repo, groups) in previous_index.items()
+        if repo_id not in current_index
+    ]
+
+    return {
+        "version": CHANGE_FEED_VERSION,
+        "username": dataset.get("username"),
+        "previous_generated_at": previous.get("generated_at"),
+        "generated_at": dataset.get("generated_at"),
+        "total_repos": dataset.get("total_repos"),
+        "added": sort_entries(added),
+        "removed": sort_entries(removed),
+        "moved": sort_entries(moved),
+        "updated": sort_entries(updated),
+    }
+
+
+def summarize_change_feed(feed: dict[str, Any]) -> str:
+    return (
+        f"{len(feed['added'])} new, {len(feed['removed'])} unstarred, "
+        f"{len(feed['moved'])} moved, {len(feed['updated'])} updated"
+    )
@@ -0,0 +1,222 @@
+"""Optional enrichment of starred repos with release, issue and license details fetched in bulk."""
+
+from __future__ import annotations
+
+import argparse
+import contextvars
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+from urllib.error import URLError
+
+from stars_http import ConnectionPool, DeadlineExceeded, request_graphql
+from stars_metrics import METRICS
+from stars_output import write_file_atomic
+
+if TYPE_CHECKING:
+    from sync_starred_lists import StarredRepo
+
+
+DEFAULT_ENRICH_CACHE_PATH = Path(".cache/starred-lists/enrichment.json")
+DEFAULT_ENRICH_BATCH_SIZE = 50
+DEFAULT_ENRICH_TTL_HOURS = 24.0
+ENRICH_CACHE_VERSION = 1
+DETAILS_FRAGMENT = """
+fragment RepoDetails on Repository {
+  latestRelease { tagName name publishedAt url }
+  issues(states: OPEN) { totalCount }
+  licenseInfo { spdxId name }
+}
+"""
+# Batch runs save the cache from several account threads.
+_SAVE_LOCK = threading.Lock()
+
+
+def add_enrich_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--enrich",
+        action="store_true",
+        help=(
+            "Add latest_release, open_issues_count and license to every repo, fetched in batches through "
+            "the GraphQL API (requires a token) and cached per repo."
+        ),
+    )
+    parser.add_argument(
+        "--enrich-batch-size",
+        type=int,
+        default=DEFAULT_ENRICH_BATCH_SIZE,
+        help=f"Repositories looked up per GraphQL query (default: {DEFAULT_ENRICH_BATCH_SIZE}).",
+    )
+    parser.add_argument(
+        "--enrich-ttl",
+        type=float,
+        default=DEFAULT_ENRICH_TTL_HOURS,
+        help=f"Refetch a repo's details once they are older than this many hours (default: {DEFAULT_ENRICH_TTL_HOURS:g}).",
+    )
+    parser.add_argument(
+        "--enrich-cache",
+        type=Path,
+        default=DEFAULT_ENRICH_CACHE_PATH,
+        help=f"Where fetched details are cached; --no-cache skips it (default: {DEFAULT_ENRICH_CACHE_PATH}).",
+    )
+
+
+class EnrichmentCache:
+    """Details per repo id with the time they were fetched, persisted as one JSON file."""
+
+    def __init__(self, path: Path | None) -> None:
+        self.path = path
+        self.entries: dict[str, dict[str, Any]] = self._read() if path is not None else {}
+        self._updated: dict[str, dict[str, Any]] = {}
+
+    def _read(self) -> dict[str, dict[str, Any]]:
+        try:
+            with self.path.open("r", encoding="utf-8") as handle:
+                payload = json.load(handle)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(payload, dict) or payload.get("version") != ENRICH_CACHE_VERSION:
+            return {}
+        repos = payload.get("repos")
+        return repos if isinstance(repos, dict) else {}
+
+    def get(self, repo_id: int, max_age: float | None) -> tuple[bool, dict[str, Any] | None]:
+        """Return whether the repo has an entry no older than max_age seconds, and its details."""
+        entry = self.entries.get(str(repo_id))
+        if not isinstance(entry, dict) or not isinstance(entry.get("fetched_at"), (int, float)):
+            return False, None
+        if max_age is not None and time.time() - entry["fetched_at"] > max_age:
+            return False, entry.get("details")
+        return True, entry.get("details")
+
+    def put(self, repo_id: int, details: dict[str, Any] | None) -> None:
+        entry = {"fetched_at": time.time(), "details": details}
+        self.entries[str(repo_id)] = entry
+        self._updated[str(repo_id)] = entry
+
+    def save(self) -> None:
+        if self.path is None or not self._updated:
+            return
+        with _SAVE_LOCK:
+            # Merge into what is on disk so concurrent runs keep each other's entries.
+            entries = self._read()
+            entries.update(self._updated)
+            payload = {"version": ENRICH_CACHE_VERSION, "repos": entries}
+            write_file_atomic(self.path, json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+        self._updated = {}
+
+
+def build_details_query(count: int) -> str:
+    params = ", ".join(f"$o{index}: String!, $n{index}: String!" for index in range(count))
+    fields = "\n".join(
+        f"  r{index}: repository(owner: $o{index}, name: $n{index}) {{ ...RepoDetails }}" for index in range(count)
+    )
+    return f"query({params}) {{\n{fields}\n}}\n{DETAILS_FRAGMENT}"
+
+
+def details_from_node(node: dict[str, Any]) -> dict[str, Any]:
+    release = node.get("latestRelease")
+    license_info = node.get("licenseInfo")
+    return {
+        "latest_release": (
+            {
+                "tag_name": release.get("tagName"),
+                "name": release.get("name"),
+                "published_at": release.get("publishedAt"),
+                "html_url": release.get("url"),
+            }
+            if isinstance(release, dict)
+            else None
+        ),
+        "open_issues_count": (node.get("issues") or {}).get("totalCount"),
+        "license": (
+            license_info.get("spdxId") or license_info.get("name") if isinstance(license_info, dict) else None
+        ),
+    }
+
+
+def fetch_details(
+    batch: list[StarredRepo],
+    token: str,
+    url: str,
+    pool: ConnectionPool | None = None,
+) -> dict[int, dict[str, Any] | None]:
+    """Look up one batch in a single aliased query; repos GitHub cannot resolve map to None."""
+    variables: dict[str, str] = {}
+    for index, repo in enumerate(batch):
+        owner, _, name = repo.full_name.partition("/")
+        variables[f"o{index}"] = owner
+        variables[f"n{index}"] = name
+    with METRICS.stage("enrich_fetch"):
+        data = request_graphql(url, build_details_query(len(batch)), variables, token, pool, allow_partial=True)
+    results: dict[int, dict[str, Any] | None] = {}
+    for index, repo in enumerate(batch):
+        node = data.get(f"r{index}")
+        results[repo.id] = details_from_node(node) if isinstance(node, dict) else None
+    return results
+
+
+def enrich_repos(
+    repos: list[StarredRepo],
+    token: str | None,
+    url: str,
+    pool: ConnectionPool | None,
+    cache_path: Path | None,
+    ttl_hours: float,
+    batch_size: int,
+    concurrency: int,
+    offline: bool = False,
+) -> None:
+    """Attach details to every repo, fetching only repos whose cached details are missing or stale.
+
+    A batch that fails keeps whatever stale details its repos had, so one bad
+    response never drops enrichment from the dataset.
+    """
+    cache = EnrichmentCache(cache_path)
+    stale: list[StarredRepo] = []
+    for repo in repos:
+        fresh, details = cache.get(repo.id, None if offline else ttl_hours * 3600)
+        repo.details = details
+        if not fresh:
+            stale.append(repo)
+    METRICS.incr("enrich_cache_hits", len(repos) - len(stale))
+    METRICS.incr("enrich_cache_misses", len(stale))
+    if offline or not stale or not token:
+        return
+
+    stale_by_id = {repo.id: repo for repo in stale}
+    unique = list(stale_by_id.values())
+    size = max(1, batch_size)
+    batches = [unique[start : start + size] for start in range(0, len(unique), size)]
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    fetched = failed = 0
+    context = contextvars.copy_context()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = [
+            executor.submit(context.copy().run, fetch_details, batch, token, url, pool) for batch in batches
+        ]
+        for future in futures:
+            try:
+                results = future.result()
+            except DeadlineExceeded:
+                raise
+            except (RuntimeError, URLError, ValueError) as error:
+                failed += 1
+                print(f"Warning: failed to enrich a batch of repositories: {error}", file=sys.stderr)
+                continue
+            fetched += len(results)
+            for repo_id, details in results.items():
+                cache.put(repo_id, details)
+                stale_by_id[repo_id].details = details
+    print(f"Fetched details for {fetched} repositories in {len(batches) - failed} queries.")
+    if failed:
+        print(f"Warning: {failed} enrichment queries failed; their repos keep cached details.", file=sys.stderr)
+    try:
+        cache.save()
+    except OSError as error:
+        print(f"Warning: could not save the enrichment cache: {error}", file=sys.stderr)
@@ -0,0 +1,110 @@
+"""Skip runs that would redo a recent successful run of the GitHub stars scripts."""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from stars_output import write_file_atomic
+
+
+DEFAULT_FRESHNESS_PATH = Path(".cache/starred-lists/last-run.json")
+# Options that change what a run writes; a run only counts as fresh for the same values.
+OUTPUT_OPTIONS = (
+    "backend",
+    "enrich",
+    "incremental",
+    "format",
+    "compact",
+    "precompress",
+    "no_changes",
+    "preserve_unmatched",
+    "max_pages",
+)
+# Batch runs record several accounts from worker threads into the same file.
+_RECORD_LOCK = threading.Lock()
+
+
+def add_freshness_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--fresh-for",
+        type=float,
+        default=0.0,
+        help=(
+            "Exit early, before any network access, when the same command succeeded less than this "
+            "many seconds ago and the mapping file is unchanged since (default: 0, always run)."
+        ),
+    )
+    parser.add_argument(
+        "--freshness-file",
+        type=Path,
+        default=DEFAULT_FRESHNESS_PATH,
+        help=f"Where successful runs are recorded for --fresh-for (default: {DEFAULT_FRESHNESS_PATH}).",
+    )
+
+
+def run_key(args: argparse.Namespace, script: str, mapping_path: Path, outputs: list[Path]) -> str:
+    options = {name: getattr(args, name) for name in OUTPUT_OPTIONS if hasattr(args, name)}
+    return json.dumps(
+        [script, str(mapping_path), [str(path) for path in outputs], args.username, options], sort_keys=True
+    )
+
+
+def mapping_fingerprint(mapping_path: Path) -> tuple[list[int], str]:
+    stat = mapping_path.stat()
+    return [stat.st_mtime_ns, stat.st_size], hashlib.sha256(mapping_path.read_bytes()).hexdigest()
+
+
+def load_runs(path: Path) -> dict[str, Any]:
+    try:
+        with path.open("r", encoding="utf-8") as handle:
+            runs = json.load(handle)
+    except (OSError, ValueError):
+        return {}
+    return runs if isinstance(runs, dict) else {}
+
+
+def fresh_run_age(
+    args: argparse.Namespace, script: str, mapping_path: Path, outputs: list[Path]
+) -> float | None:
+    """Return how long ago the matching run finished when it is still fresh, else None."""
+    if args.fresh_for <= 0:
+        return None
+    run = load_runs(args.freshness_file).get(run_key(args, script, mapping_path, outputs))
+    if not isinstance(run, dict) or not isinstance(run.get("finished_at"), (int, float)):
+        return None
+    age = time.time() - run["finished_at"]
+    if not 0 <= age < args.fresh_for or not all(path.exists() for path in outputs):
+        return None
+
+    # The stat check avoids reading the mapping at all in the common case.
+    try:
+        stat = mapping_path.stat()
+        if [stat.st_mtime_ns, stat.st_size] != run.get("mapping_stat"):
+            if hashlib.sha256(mapping_path.read_bytes()).hexdigest() != run.get("mapping_hash"):
+                return None
+    except OSError:
+        return None
+    return age
+
+
+def record_run(args: argparse.Namespace, script: str, mapping_path: Path, outputs: list[Path]) -> None:
+    """Remember a successful run so a later --fresh-for can skip repeating it."""
+    try:
+        mapping_stat, mapping_hash = mapping_fingerprint(mapping_path)
+        with _RECORD_LOCK:
+            runs = load_runs(args.freshness_file)
+            runs[run_key(args, script, mapping_path, outputs)] = {
+                "finished_at": time.time(),
+                "mapping_stat": mapping_stat,
+                "mapping_hash": mapping_hash,
+            }
+            write_file_atomic(args.freshness_file, (json.dumps(runs, indent=2) + "\n").encode("utf-8"))
+    except OSError as error:
+        print(f"Could not record run for --fresh-for: {error}", file=sys.stderr)
@@ -0,0 +1,793 @@
+"""Shared HTTP helpers for the GitHub stars scripts."""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from contextlib import ExitStack, contextmanager, nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+from urllib.error import HTTPError, URLError
+from urllib.parse import urljoin, urlsplit
+
+from stars_metrics import METRICS
+
+if TYPE_CHECKING:
+    import http.client
+    from email.message import Message
+
+# http.client, email and urllib.request are imported where they are used: together they
+# are a large share of startup time, and runs that end early never need them.
+
+
+DEFAULT_CACHE_DIR = Path(".cache/starred-lists/http")
+DEFAULT_CACHE_MAX_AGE = 7 * 24 * 60 * 60
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_TIMEOUT = 30.0
+MAX_REDIRECTS = 5
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+STREAM_CHUNK_SIZE = 64 * 1024
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_MAX_RPS = 10.0
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+# Which account a request is made for, so batch runs can share request slots fairly.
+CURRENT_ACCOUNT: ContextVar[str | None] = ContextVar("CURRENT_ACCOUNT", default=None)
+
+
+class DeadlineExceeded(RuntimeError):
+    """Raised when a request would start or wait past the run deadline."""
+
+
+class FairSlots:
+    """Cap requests in flight, granting free slots to waiting accounts in turn.
+
+    An account that keeps many requests queued gets one slot per round, so a
+    large account cannot starve the others sharing the limit.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit = max(1, limit)
+        self.granted: dict[str | None, int] = {}
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._waiting: dict[str | None, deque[object]] = {}
+        # Accounts with waiting requests, next to be served first.
+        self._turns: deque[str | None] = deque()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        account = CURRENT_ACCOUNT.get()
+        ticket = object()
+        with self._condition:
+            queue = self._waiting.get(account)
+            if queue is None:
+                queue = self._waiting[account] = deque()
+                self._turns.append(account)
+            queue.append(ticket)
+            while self._in_flight >= self.limit or self._turns[0] != account or queue[0] is not ticket:
+                self._condition.wait()
+            queue.popleft()
+            self._turns.popleft()
+            if queue:
+                self._turns.append(account)
+            else:
+                del self._waiting[account]
+            self._in_flight += 1
+            self.granted[account] = self.granted.get(account, 0) + 1
+            self._condition.notify_all()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
+
+
+@dataclass
+class HttpResponse:
+    url: str
+    status: int
+    headers: Message
+    body: bytes
+    from_cache: bool = False
+
+
+def build_headers(items: list[tuple[str, str]]) -> Message:
+    from email.message import Message
+
+    headers = Message()
+    for key, value in items:
+        headers[key] = value
+    return headers
+
+
+class ResponseCache:
+    """On-disk response cache revalidated with ETag / Last-Modified."""
+
+    def __init__(self, directory: Path, max_age: float, max_bytes: int) -> None:
+        self.directory = directory
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._write_warned = False
+
+    def _paths(self, url: str) -> tuple[Path, Path]:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.directory / f"{key}.json", self.directory / f"{key}.body"
+
+    def lookup(self, url: str) -> dict[str, Any] | None:
+        meta_path, body_path = self._paths(url)
+        try:
+            with meta_path.open("r", encoding="utf-8") as handle:
+                entry = json.load(handle)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(entry, dict) or entry.get("url") != url:
+            return None
+        try:
+            validated_at = body_path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+        if time.time() - validated_at > self.max_age:
+            self._remove(meta_path, body_path)
+            return None
+        return entry
+
+    def conditional_headers(self, entry: dict[str, Any]) -> dict[str, str]:
+        headers: dict[str, str] = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = str(entry["etag"])
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = str(entry["last_modified"])
+        return headers
+
+    def read_body(self, url: str) -> bytes | None:
+        _, body_path = self._paths(url)
+        try:
+            body = body_path.read_bytes()
+        except OSError:
+            return None
+        # Touch the entry so a revalidated body stays fresh and size-based eviction
+        # drops the least recently used entries first.
+        os.utime(body_path)
+        return body
+
+    def iter_body(self, url: str) -> Iterator[bytes] | None:
+        _, body_path = self._paths(url)
+        try:
+            handle = body_path.open("rb")
+        except OSError:
+            return None
+        os.utime(body_path)
+
+        def chunks() -> Iterator[bytes]:
+            with handle:
+                while chunk := handle.read(STREAM_CHUNK_SIZE):
+                    yield chunk
+
+        return chunks()
+
+    def open_writer(self, url: str, headers: Message) -> CacheWriter | None:
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return None
+
+        entry = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "stored_at": time.time(),
+            "headers": [[key, value] for key, value in headers.items()],
+        }
+        meta_path, body_path = self._paths(url)
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            return CacheWriter(entry, meta_path, body_path, self.write_failed)
+        except OSError as error:
+            self.write_failed(error)
+            return None
+
+    def write_failed(self, error: OSError) -> None:
+        """Note a cache write that failed; the response is still used, just not cached."""
+        METRICS.incr("cache_write_errors")
+        with self._lock:
+            warned, self._write_warned = self._write_warned, True
+        if not warned:
+            print(f"Warning: could not write the HTTP cache, continuing uncached: {error}", file=sys.stderr)
+
+    def store(self, url: str, headers: Message, body: bytes) -> None:
+        writer = self.open_writer(url, headers)
+        if writer is None:
+            return
+        writer.write(body)
+        writer.commit()
+
+    def _remove(self, meta_path: Path, body_path: Path) -> None:
+        for path in (meta_path, body_path):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def prune(self) -> None:
+        """Drop expired entries, then the least recently used ones above max_bytes."""
+        if not self.directory.is_dir():
+            return
+
+        with self._lock:
+            now = time.time()
+            entries: list[tuple[float, int, Path, Path]] = []
+            for body_path in self.directory.glob("*.body"):
+                meta_path = body_path.with_suffix(".json")
+                try:
+                    stat = body_path.stat()
+                except FileNotFoundError:
+                    continue
+                if not meta_path.exists() or now - stat.st_mtime > self.max_age:
+                    self._remove(meta_path, body_path)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, meta_path, body_path))
+
+            total = sum(size for _, size, _, _ in entries)
+            for _, size, meta_path, body_path in sorted(entries, key=lambda item: item[0]):
+                if total <= self.max_bytes:
+                    break
+                self._remove(meta_path, body_path)
+                total -= size
+
+
+class RequestScheduler:
+    """Pace, retry and rate-limit every outbound request of a run.
+
+    Each host gets a token bucket capping requests per second across all
+    threads, and GitHub's X-RateLimit-Remaining/Reset headers pause requests
+    to that host once its budget is spent. Failed requests are retried with
+    exponential backoff and jitter, honouring Retry-After. Nothing waits past
+    the run deadline. With max_in_flight, requests also share that many slots
+    fairly across accounts.
+    """
+
+    def __init__(
+        self,
+        max_rps: float = DEFAULT_MAX_RPS,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        deadline: float | None = None,
+        max_in_flight: int | None = None,
+    ) -> None:
+        self.max_rps = max_rps
+        self.max_retries = max_retries
+        self.deadline = deadline
+        self.slots = FairSlots(max_in_flight) if max_in_flight else None
+        self._lock = threading.Lock()
+        # host -> [tokens, refilled_at]
+        self._buckets: dict[str, list[float]] = {}
+        # host -> [remaining, reset_at]
+        self._budgets: dict[str, list[float | None]] = {}
+
+    def sleep(self, seconds: float) -> None:
+        if seconds <= 0:
+            return
+        if self.deadline is not None and time.monotonic() + seconds > self.deadline:
+            raise DeadlineExceeded(f"waiting {seconds:.1f}s would pass the run deadline")
+        time.sleep(seconds)
+
+    def _take_token(self, host: str) -> None:
+        if self.max_rps <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            burst = max(1.0, self.max_rps)
+            bucket = self._buckets.setdefault(host, [burst, now])
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * self.max_rps)
+            bucket[1] = now
+            # Reserve a token even when the bucket is empty so waiting callers queue up in order.
+            bucket[0] -= 1
+            wait = -bucket[0] / self.max_rps if bucket[0] < 0 else 0.0
+        self.sleep(wait)
+
+    def _wait_for_rate_limit(self, host: str) -> None:
+        with self._lock:
+            budget = self._budgets.get(host)
+            if budget is None or budget[0] is None:
+                return
+            if budget[0] > 0:
+                budget[0] -= 1
+                return
+            delay = (budget[1] or 0.0) - time.time()
+            if delay <= 0:
+                # The window has reset; the next response reports the new budget.
+                budget[0] = None
+                return
+        # Every worker waits for the reset, not just the one that saw the budget run out.
+        METRICS.incr("rate_limit_waits")
+        print(f"GitHub rate limit exhausted, waiting {int(delay) + 1}s for reset.", file=sys.stderr)
+        self.sleep(delay + 1)
+
+    def request_slot(self) -> Any:
+        return self.slots.slot() if self.slots is not None else nullcontext()
+
+    def before_request(self, host: str) -> None:
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise DeadlineExceeded("run deadline reached before the next request")
+        self._wait_for_rate_limit(host)
+        self._take_token(host)
+
+    def update(self, host: str, headers: Message) -> None:
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset_at = headers.get("X-RateLimit-Reset")
+        with self._lock:
+            budget = self._budgets.setdefault(host, [None, None])
+            if remaining is not None and remaining.isdigit():
+                budget[0] = int(remaining)
+            if reset_at is not None and reset_at.isdigit():
+                budget[1] = float(reset_at)
+
+    def retry_delay(self, attempt: int, headers: Message | None) -> float:
+        if headers is not None:
+            retry_after = headers.get("Retry-After")
+            if retry_after:
+                if retry_after.strip().isdigit():
+                    return float(retry_after) + random.uniform(0, 1)
+                from email.utils import parsedate_to_datetime
+
+                try:
+                    return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+                except (TypeError, ValueError):
+                    pass
+            reset_at = headers.get("X-RateLimit-Reset")
+            if headers.get("X-RateLimit-Remaining") == "0" and reset_at and reset_at.isdigit():
+                return max(0.0, float(reset_at) - time.time()) + random.uniform(0, 1)
+        # Full jitter keeps parallel workers from retrying in lockstep.
+        return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt))
+
+    def should_retry(self, error: Exception, attempt: int) -> bool:
+        if attempt >= self.max_retries:
+            return False
+        if isinstance(error, HTTPError):
+            if error.code in RETRYABLE_STATUSES:
+                return True
+            # GitHub reports primary and secondary rate limits as 403.
+            headers = error.headers
+            return error.code == 403 and headers is not None and (
+                bool(headers.get("Retry-After")) or headers.get("X-RateLimit-Remaining") == "0"
+            )
+        return isinstance(error, URLError)
+
+
+SCHEDULER = RequestScheduler()
+
+
+class CacheWriter:
+    """Write a response body to a temp file and publish it into the cache on commit."""
+
+    def __init__(
+        self,
+        entry: dict[str, Any],
+        meta_path: Path,
+        body_path: Path,
+        on_error: Callable[[OSError], None],
+    ) -> None:
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        self.entry = entry
+        self.meta_path = meta_path
+        self.body_path = body_path
+        self.body_tmp = body_path.with_name(body_path.name + suffix)
+        self.meta_tmp = meta_path.with_name(meta_path.name + suffix)
+        self.on_error = on_error
+        self.failed = False
+        self._handle = self.body_tmp.open("wb")
+
+    def write(self, chunk: bytes) -> None:
+        if self.failed:
+            return
+        try:
+            self._handle.write(chunk)
+        except OSError as error:
+            self._fail(error)
+
+    def commit(self) -> None:
+        if self.failed:
+            return
+        try:
+            self._handle.close()
+            with self.meta_tmp.open("w", encoding="utf-8") as handle:
+                json.dump(self.entry, handle)
+            os.replace(self.body_tmp, self.body_path)
+            os.replace(self.meta_tmp, self.meta_path)
+        except OSError as error:
+            self._fail(error)
+
+    def _fail(self, error: OSError) -> None:
+        # A cache that cannot be written must never fail the request it was caching.
+        self.failed = True
+        self.discard()
+        self.on_error(error)
+
+    def discard(self) -> None:
+        try:
+            self._handle.close()
+        except OSError:
+            pass
+        for path in (self.body_tmp, self.meta_tmp):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+class PooledResponse:
+    """Minimal urlopen-like view over a response read from a pooled connection."""
+
+    def __init__(self, url: str, response: http.client.HTTPResponse) -> None:
+        self.url = url
+        self.status = response.status
+        self.headers = response.msg
+        self._response = response
+
+    def read(self, amt: int | None = None) -> bytes:
+        import http.client
+
+        try:
+            return self._response.read(amt)
+        except (OSError, http.client.HTTPException) as error:
+            raise URLError(error) from error
+
+
+class ConnectionPool:
+    """Keep-alive HTTP(S) connections shared across threads, reused per host."""
+
+    def __init__(self, max_idle_per_host: int = 4, timeout: float = DEFAULT_TIMEOUT) -> None:
+        self.max_idle_per_host = max_idle_per_host
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._idle: dict[tuple[str, str], list[http.client.HTTPConnection]] = {}
+
+    def _acquire(self, scheme: str, netloc: str) -> tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            idle = self._idle.get((scheme, netloc))
+            if idle:
+                return idle.pop(), True
+        return self.connect(scheme, netloc), False
+
+    def connect(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        import http.client
+
+        if scheme == "https":
+            return http.client.HTTPSConnection(netloc, timeout=self.timeout)
+        return http.client.HTTPConnection(netloc, timeout=self.timeout)
+
+    def _release(self, scheme: str, netloc: str, connection: http.client.HTTPConnection) -> None:
+        with self._lock:
+            idle = self._idle.setdefault((scheme, netloc), [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def _send(
+        self, url: str, headers: dict[str, str], data: bytes | None = None
+    ) -> tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+        import http.client
+
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        connection, reused = self._acquire(parts.scheme, parts.netloc)
+        try:
+            connection.request("GET" if data is None else "POST", path, body=data, headers=headers)
+            return connection, connection.getresponse()
+        except (OSError, http.client.HTTPException) as error:
+            connection.close()
+            if reused:
+                # The server may have dropped an idle keep-alive connection; retry on a fresh one.
+                METRICS.incr("reconnects")
+                return self._send(url, headers, data)
+            raise URLError(error) from error
+
+    def _finish(self, url: str, connection: http.client.HTTPConnection, response: http.client.HTTPResponse) -> None:
+        # A connection can only be reused once its response has been read to the end.
+        if response.will_close or not response.isclosed():
+            connection.close()
+            return
+        parts = urlsplit(url)
+        self._release(parts.scheme, parts.netloc, connection)
+
+    @contextmanager
+    def open(self, url: str, headers: dict[str, str], data: bytes | None = None) -> Iterator[PooledResponse]:
+        import http.client
+
+        for _ in range(MAX_REDIRECTS + 1):
+            connection, response = self._send(url, headers, data)
+            try:
+                if response.status < 300:
+                    yield PooledResponse(url, response)
+                    return
+                body = PooledResponse(url, response).read()
+            finally:
+                self._finish(url, connection, response)
+
+            location = response.msg.get("Location")
+            if response.status in REDIRECT_STATUSES and location and data is None:
+                url = urljoin(url, location)
+                continue
+            reason = http.client.responses.get(response.status, "")
+            raise HTTPError(url, response.status, reason, response.msg, io.BytesIO(body))
+        raise URLError(f"Too many redirects for {url}")
+
+    def request(self, url: str, headers: dict[str, str], data: bytes | None = None) -> HttpResponse:
+        with self.open(url, headers, data) as response:
+            return HttpResponse(response.url, response.status, response.headers, response.read())
+
+    def close(self) -> None:
+        with self._lock:
+            connections = [connection for idle in self._idle.values() for connection in idle]
+            self._idle.clear()
+        for connection in connections:
+            connection.close()
+
+
+@contextmanager
+def _open_url_stream(
+    url: str, headers: dict[str, str], pool: ConnectionPool | None, data: bytes | None
+) -> Iterator[Any]:
+    if pool is not None:
+        with pool.open(url, headers, data) as response:
+            yield response
+        return
+    from urllib.request import Request, urlopen
+
+    request = Request(url, data=data, headers=headers)
+    with urlopen(request, timeout=DEFAULT_TIMEOUT) as response:  # noqa: S310
+        yield response
+
+
+@contextmanager
+def open_url_stream(
+    url: str,
+    headers: dict[str, str],
+    pool: ConnectionPool | None = None,
+    data: bytes | None = None,
+) -> Iterator[Any]:
+    """Open a response for streaming through the scheduler, retrying until headers arrive.
+
+    Only failures before the response headers are retried; a body that breaks
+    mid-stream surfaces to the caller.
+    """
+    host = urlsplit(url).netloc
+    attempt = 0
+    while True:
+        with ExitStack() as stack:
+            # The slot is held while the body streams and released before any retry backoff.
+            stack.enter_context(SCHEDULER.request_slot())
+            SCHEDULER.before_request(host)
+            METRICS.incr("requests")
+            started = time.perf_counter()
+            try:
+                response = stack.enter_context(_open_url_stream(url, headers, pool, data))
+            except (HTTPError, URLError) as error:
+                METRICS.observe_latency(time.perf_counter() - started)
+                error_headers = error.headers if isinstance(error, HTTPError) else None
+                if error_headers is not None:
+                    SCHEDULER.update(host, error_headers)
+                if not SCHEDULER.should_retry(error, attempt):
+                    raise
+                delay = SCHEDULER.retry_delay(attempt, error_headers)
+            else:
+                METRICS.observe_latency(time.perf_counter() - started)
+                SCHEDULER.update(host, response.headers)
+                yield response
+                return
+        METRICS.incr("retries")
+        attempt += 1
+        SCHEDULER.sleep(delay)
+
+
+def open_url(
+    url: str,
+    headers: dict[str, str],
+    pool: ConnectionPool | None = None,
+    data: bytes | None = None,
+) -> HttpResponse:
+    with open_url_stream(url, headers, pool, data) as response:
+        result = HttpResponse(response.url, response.status, response.headers, response.read())
+    METRICS.incr("response_bytes", len(result.body))
+    return result
+
+
+def post_json(
+    url: str,
+    payload: Any,
+    headers: dict[str, str],
+    pool: ConnectionPool | None = None,
+) -> HttpResponse:
+    request_headers = {**headers, "Content-Type": "application/json"}
+    return open_url(url, request_headers, pool, json.dumps(payload).encode("utf-8"))
+
+
+def request_graphql(
+    url: str,
+    query: str,
+    variables: dict[str, Any],
+    token: str,
+    pool: ConnectionPool | None = None,
+    allow_partial: bool = False,
+) -> dict[str, Any]:
+    """Run a GraphQL query and return its data.
+
+    Errors fail the call unless allow_partial is set, in which case the data
+    is returned as long as there is some; fields that failed are null.
+    """
+    headers = {
+        "Accept": "application/json",
+        "Authorization": f"Bearer {token}",
+        "User-Agent": "starred-lists-sync-script",
+    }
+    with METRICS.stage("request_graphql"):
+        response = post_json(url, {"query": query, "variables": variables}, headers, pool)
+        with METRICS.stage("json_decode"):
+            payload = json.loads(response.body.decode("utf-8"))
+
+    if not isinstance(payload, dict):
+        raise RuntimeError("Unexpected GitHub GraphQL response format.")
+    errors = payload.get("errors")
+    data = payload.get("data")
+    if errors and not (allow_partial and isinstance(data, dict)):
+        messages = "; ".join(str(error.get("message") if isinstance(error, dict) else error) for error in errors)
+        raise RuntimeError(f"GitHub GraphQL error: {messages}")
+    if not isinstance(data, dict):
+        raise RuntimeError("Unexpected GitHub GraphQL response format.")
+    return data
+
+
+def fetch(
+    url: str,
+    headers: dict[str, str],
+    cache: ResponseCache | None = None,
+    pool: ConnectionPool | None = None,
+) -> HttpResponse:
+    entry = cache.lookup(url) if cache is not None else None
+    request_headers = dict(headers)
+    if cache is not None and entry is not None:
+        request_headers.update(cache.conditional_headers(entry))
+
+    try:
+        result = open_url(url, request_headers, pool)
+    except HTTPError as error:
+        if error.code != 304 or cache is None or entry is None:
+            raise
+        METRICS.incr("cache_hits")
+        body = cache.read_body(url)
+        if body is None:
+            return fetch(url, headers, pool=pool)
+        cached_headers = build_headers([(str(key), str(value)) for key, value in entry.get("headers") or []])
+        for key, value in error.headers.items():
+            del cached_headers[key]
+            cached_headers[key] = value
+        return HttpResponse(url, 200, cached_headers, body, from_cache=True)
+
+    if cache is not None:
+        METRICS.incr("cache_misses")
+        cache.store(url, result.headers, result.body)
+    return result
+
+
+def fetch_stream(
+    url: str,
+    headers: dict[str, str],
+    cache: ResponseCache | None = None,
+    pool: ConnectionPool | None = None,
+) -> Iterator[bytes]:
+    """Yield the response body in chunks, teeing it into the cache as it arrives."""
+    entry = cache.lookup(url) if cache is not None else None
+    request_headers = dict(headers)
+    if cache is not None and entry is not None:
+        request_headers.update(cache.conditional_headers(entry))
+
+    try:
+        with open_url_stream(url, request_headers, pool) as response:
+            writer = cache.open_writer(url, response.headers) if cache is not None else None
+            if cache is not None:
+                METRICS.incr("cache_misses")
+            try:
+                while chunk := response.read(STREAM_CHUNK_SIZE):
+                    METRICS.incr("response_bytes", len(chunk))
+                    if writer is not None:
+                        writer.write(chunk)
+                    yield chunk
+            except BaseException:
+                if writer is not None:
+                    writer.discard()
+                raise
+            if writer is not None:
+                writer.commit()
+            return
+    except HTTPError as error:
+        if error.code != 304 or cache is None or entry is None:
+            raise
+        METRICS.incr("cache_hits")
+
+    chunks = cache.iter_body(url)
+    if chunks is None:
+        yield from fetch_stream(url, headers, pool=pool)
+        return
+    yield from chunks
+
+
+def add_cache_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=DEFAULT_CACHE_DIR,
+        help=f"Directory for the conditional-request HTTP cache (default: {DEFAULT_CACHE_DIR}).",
+    )
+    parser.add_argument(
+        "--cache-max-age",
+        type=float,
+        default=DEFAULT_CACHE_MAX_AGE,
+        help=f"Evict cached responses older than this many seconds (default: {DEFAULT_CACHE_MAX_AGE}).",
+    )
+    parser.add_argument(
+        "--cache-max-bytes",
+        type=int,
+        default=DEFAULT_CACHE_MAX_BYTES,
+        help=f"Evict least recently used responses above this total size (default: {DEFAULT_CACHE_MAX_BYTES}).",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Disable the HTTP cache and always download full responses.",
+    )
+
+
+def cache_from_args(args: argparse.Namespace) -> ResponseCache | None:
+    if args.no_cache:
+        return None
+    cache = ResponseCache(args.cache_dir, args.cache_max_age, args.cache_max_bytes)
+    cache.prune()
+    return cache
+
+
+def add_scheduler_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=DEFAULT_MAX_RETRIES,
+        help=f"Retry rate-limited, 5xx and network failures this many times (default: {DEFAULT_MAX_RETRIES}).",
+    )
+    parser.add_argument(
+        "--max-rps",
+        type=float,
+        default=DEFAULT_MAX_RPS,
+        help=f"Cap outbound requests per second across all workers; 0 disables (default: {DEFAULT_MAX_RPS:g}).",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        default=None,
+        help="Abort the run without writing output if it takes longer than this many seconds.",
+    )
+
+
+def configure_scheduler(args: argparse.Namespace, max_in_flight: int | None = None) -> RequestScheduler:
+    global SCHEDULER
+    deadline = time.monotonic() + args.deadline if args.deadline is not None else None
+    SCHEDULER = RequestScheduler(args.max_rps, args.max_retries, deadline, max_in_flight)
+    return SCHEDULER
@@ -0,0 +1,115 @@
+"""Run metrics shared by the GitHub stars scripts."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metrics:
+    """Thread-safe counters, request latency histogram and per-stage timings."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters: dict[str, int] = {}
+            self.stages: dict[str, dict[str, float]] = {}
+            self.latency_buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def incr(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe_latency(self, seconds: float) -> None:
+        index = next((i for i, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound), len(LATENCY_BUCKETS))
+        with self._lock:
+            self.latency_buckets[index] += 1
+
+    def add_stage_time(self, name: str, seconds: float) -> None:
+        with self._lock:
+            stage = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0})
+            stage["calls"] += 1
+            stage["seconds"] += seconds
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage_time(name, time.perf_counter() - started)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            labels = [f"le_{bound:g}" for bound in LATENCY_BUCKETS] + ["le_inf"]
+            return {
+                "counters": dict(sorted(self.counters.items())),
+                "latency_histogram": dict(zip(labels, self.latency_buckets)),
+                "stages": {
+                    name: {"calls": int(stage["calls"]), "seconds": round(stage["seconds"], 6)}
+                    for name, stage in sorted(self.stages.items())
+                },
+            }
+
+
+METRICS = Metrics()
+
+
+def add_metrics_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--metrics-json",
+        type=Path,
+        default=None,
+        help="Write request counters, latency histogram and stage timings to this JSON file.",
+    )
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        default=None,
+        help="Write a cProfile dump of the run to this file (inspect with python -m pstats).",
+    )
+
+
+@contextmanager
+def instrumented_run(script: str, args: argparse.Namespace) -> Iterator[None]:
+    METRICS.reset()
+    profiler = None
+    if args.profile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+    started_at = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            args.profile.parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(str(args.profile))
+        if args.metrics_json:
+            report = {
+                "script": script,
+                "started_at": started_at.isoformat(),
+                "wall_seconds": round(time.perf_counter() - started, 6),
+                **METRICS.snapshot(),
+            }
+            args.metrics_json.parent.mkdir(parents=True, exist_ok=True)
+            with args.metrics_json.open("w", encoding="utf-8") as handle:
+                json.dump(report, handle, indent=2)
+                handle.write("\n")
@@ -0,0 +1,275 @@
+"""Output writers shared by the GitHub stars scripts."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections.abc import Iterable, Iterator
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Any, BinaryIO
+
+
+SHARD_INDEX_NAME = "index.json"
+SHARD_GROUPS_DIR = "groups"
+PRECOMPRESSION_FORMATS = ("gzip", "brotli")
+PRECOMPRESSION_SUFFIXES = {"gzip": ".gz", "brotli": ".br"}
+SHARD_NAME_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+VOLATILE_FIELDS = frozenset({"generated_at"})
+# Containers at this depth and below are encoded in one call; for the grouped
+# dataset that is each repo (dataset > groups > group > repos > repo).
+STREAM_DEPTH = 4
+WRITE_BUFFER_SIZE = 64 * 1024
+
+
+def json_default(value: Any) -> Any:
+    """Let ``json.dumps`` serialize record objects through their ``to_json`` method."""
+    to_json = getattr(value, "to_json", None)
+    if to_json is None:
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+    return to_json()
+
+
+def iter_json(
+    value: Any,
+    indent: int | None = None,
+    sort_keys: bool = False,
+    stream_depth: int = STREAM_DEPTH,
+    _level: int = 0,
+) -> Iterator[str]:
+    """Yield ``value`` as JSON text piece by piece, matching ``json.dumps`` output.
+
+    Dicts and lists above ``stream_depth`` are walked here; everything below is
+    encoded whole, so memory stays bounded by the largest single item.
+    """
+    if _level >= stream_depth or not isinstance(value, (dict, list)) or not value:
+        text = json.dumps(
+            value,
+            indent=indent,
+            separators=(",", ": ") if indent is not None else (",", ":"),
+            sort_keys=sort_keys,
+            default=json_default,
+        )
+        if indent is not None and _level:
+            text = text.replace("\n", "\n" + " " * (indent * _level))
+        yield text
+        return
+
+    if indent is None:
+        item_prefix, key_separator, closing = ",", ":", ""
+        first_prefix = ""
+    else:
+        first_prefix = "\n" + " " * (indent * (_level + 1))
+        item_prefix, key_separator = "," + first_prefix, ": "
+        closing = "\n" + " " * (indent * _level)
+
+    if isinstance(value, dict):
+        yield "{"
+        items = sorted(value.items()) if sort_keys else value.items()
+        for position, (key, item) in enumerate(items):
+            yield (item_prefix if position else first_prefix) + json.dumps(str(key)) + key_separator
+            yield from iter_json(item, indent, sort_keys, stream_depth, _level + 1)
+        yield closing + "}"
+    else:
+        yield "["
+        for position, item in enumerate(value):
+            yield item_prefix if position else first_prefix
+            yield from iter_json(item, indent, sort_keys, stream_depth, _level + 1)
+        yield closing + "]"
+
+
+def iter_encoded(chunks: Iterable[str], buffer_size: int = WRITE_BUFFER_SIZE) -> Iterator[bytes]:
+    """Join small text chunks into UTF-8 blocks of roughly ``buffer_size`` characters."""
+    pending: list[str] = []
+    pending_size = 0
+    for chunk in chunks:
+        pending.append(chunk)
+        pending_size += len(chunk)
+        if pending_size >= buffer_size:
+            yield "".join(pending).encode("utf-8")
+            pending.clear()
+            pending_size = 0
+    if pending:
+        yield "".join(pending).encode("utf-8")
+
+
+def content_hash(payload: Any, volatile_fields: frozenset[str] = VOLATILE_FIELDS) -> str:
+    """Hash a JSON payload, ignoring top-level fields that change on every run."""
+    if isinstance(payload, dict):
+        payload = {key: value for key, value in payload.items() if key not in volatile_fields}
+    digest = hashlib.sha256()
+    for block in iter_encoded(iter_json(payload, sort_keys=True)):
+        digest.update(block)
+    return digest.hexdigest()
+
+
+@contextmanager
+def open_atomic(path: Path) -> Iterator[BinaryIO]:
+    """Open a temp file that replaces ``path`` only once the block completes."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with tmp_path.open("wb") as handle:
+            yield handle
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def write_file_atomic(path: Path, data: bytes) -> None:
+    """Write through a temp file and rename so readers never see a partial file."""
+    with open_atomic(path) as handle:
+        handle.write(data)
+
+
+class BrotliWriter:
+    """File-like brotli compressor over an open binary handle."""
+
+    def __init__(self, handle: BinaryIO) -> None:
+        try:
+            import brotli  # type: ignore[import-not-found]
+        except ImportError as error:
+            raise RuntimeError("Brotli precompression requires the 'brotli' package.") from error
+        self._handle = handle
+        self._compressor = brotli.Compressor()
+
+    def write(self, data: bytes) -> None:
+        self._handle.write(self._compressor.process(data))
+
+    def __enter__(self) -> BrotliWriter:
+        return self
+
+    def __exit__(self, exc_type: Any, *_: Any) -> None:
+        if exc_type is None:
+            self._handle.write(self._compressor.finish())
+
+
+def open_compressed(handle: BinaryIO, fmt: str) -> Any:
+    if fmt == "gzip":
+        import gzip
+
+        return gzip.GzipFile(filename="", mode="wb", fileobj=handle, compresslevel=9, mtime=0)
+    if fmt == "brotli":
+        return BrotliWriter(handle)
+    raise ValueError(f"Unknown precompression format '{fmt}'.")
+
+
+def write_stream_with_precompressed(path: Path, blocks: Iterable[bytes], precompress: list[str]) -> None:
+    """Stream blocks to ``path`` and its precompressed copies, replacing all of them atomically."""
+    with ExitStack() as stack:
+        writers = [stack.enter_context(open_atomic(path))]
+        for fmt, suffix in PRECOMPRESSION_SUFFIXES.items():
+            compressed_path = path.with_name(path.name + suffix)
+            if fmt in precompress:
+                handle = stack.enter_context(open_atomic(compressed_path))
+                writers.append(stack.enter_context(open_compressed(handle, fmt)))
+            else:
+                # A stale compressed copy would be served instead of the fresh file.
+                compressed_path.unlink(missing_ok=True)
+        for block in blocks:
+            for writer in writers:
+                writer.write(block)
+
+
+def write_json_stream(path: Path, payload: Any, precompress: list[str], indent: int | None = 2) -> None:
+    """Serialize ``payload`` straight to disk, one item at a time, with a trailing newline."""
+    chunks = iter_json(payload, indent)
+    write_stream_with_precompressed(path, iter_encoded(_with_newline(chunks)), precompress)
+
+
+def written_with(path: Path, precompress: list[str], indent: int | None = 2) -> bool:
+    """Whether ``path`` looks like write_json_stream output with these options.
+
+    Checks that exactly the requested precompressed copies exist and that the
+    file is indented or compact as asked, so a change of output options alone
+    still triggers a rewrite.
+    """
+    for fmt, suffix in PRECOMPRESSION_SUFFIXES.items():
+        if path.with_name(path.name + suffix).exists() != (fmt in precompress):
+            return False
+    try:
+        with path.open("rb") as handle:
+            head = handle.read(2)
+    except OSError:
+        return False
+    # Objects open with "{" and, when indented, a newline straight after it.
+    return (head == b"{\n") == (indent is not None)
+
+
+def _with_newline(chunks: Iterable[str]) -> Iterator[str]:
+    yield from chunks
+    yield "\n"
+
+
+def shard_file_name(slug: str) -> str:
+    return f"{SHARD_NAME_RE.sub('-', slug).strip('-.') or 'group'}.json"
+
+
+def write_sharded_dataset(
+    dataset: dict[str, Any], shard_dir: Path, precompress: list[str], compact: bool = False
+) -> Path:
+    """Write a small index plus one compact JSON file per group; return the index path."""
+    groups_dir = shard_dir / SHARD_GROUPS_DIR
+    index_groups: list[dict[str, Any]] = []
+    written: set[str] = set()
+
+    for group in dataset["groups"]:
+        file_name = shard_file_name(str(group["slug"]))
+        if file_name in written:
+            raise ValueError(f"Group slug '{group['slug']}' collides with another shard file name.")
+        written.add(file_name)
+        blocks = iter_encoded(iter_json(group))
+        write_stream_with_precompressed(groups_dir / file_name, blocks, precompress)
+        index_groups.append(
+            {
+                "slug": group["slug"],
+                "name": group["name"],
+                "description": group.get("description", ""),
+                "count": len(group["repos"]),
+                "file": f"{SHARD_GROUPS_DIR}/{file_name}",
+            }
+        )
+
+    index = {key: value for key, value in dataset.items() if key != "groups"}
+    index["groups"] = index_groups
+    index_path = shard_dir / SHARD_INDEX_NAME
+    write_json_stream(index_path, index, precompress, None if compact else 2)
+
+    # Drop shards left behind by groups that no longer exist, but only once the new index is
+    # in place, so the index on disk never lists a shard that has already been removed.
+    if groups_dir.is_dir():
+        for path in groups_dir.iterdir():
+            base_name = path.name
+            for suffix in PRECOMPRESSION_SUFFIXES.values():
+                base_name = base_name.removesuffix(suffix)
+            if base_name not in written:
+                path.unlink()
+
+    return index_path
+
+
+def load_sharded_dataset(shard_dir: Path) -> dict[str, Any] | None:
+    """Reassemble a grouped dataset from its shard index and group files."""
+    index_path = shard_dir / SHARD_INDEX_NAME
+    if not index_path.exists():
+        return None
+
+    with index_path.open("r", encoding="utf-8") as handle:
+        index = json.load(handle)
+    if not isinstance(index, dict) or not isinstance(index.get("groups"), list):
+        return None
+
+    groups: list[Any] = []
+    for entry in index["groups"]:
+        if not isinstance(entry, dict) or not isinstance(entry.get("file"), str):
+            continue
+        with (shard_dir / entry["file"]).open("r", encoding="utf-8") as handle:
+            groups.append(json.load(handle))
+
+    dataset = {key: value for key, value in index.items() if key != "groups"}
+    dataset["groups"] = groups
+    return dataset
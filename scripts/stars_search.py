@@ -0,0 +1,67 @@
+"""Facet and token indexes over a grouped dataset, so the site can filter without scanning."""
+
+from __future__ import annotations
+
+import re
+from typing import Any
+
+
+SEARCH_INDEX_VERSION = 1
+# Runs of letters and digits; single characters are too common to be worth indexing.
+TOKEN_RE = re.compile(r"[^\W_]{2,}")
+
+
+def tokenize(*texts: str | None) -> set[str]:
+    return set(TOKEN_RE.findall(" ".join(text for text in texts if text).lower()))
+
+
+def postings(index: dict[str, list[int]]) -> dict[str, list[int]]:
+    """Sorted keys mapping to ascending id arrays, so consumers can intersect by merging."""
+    return {key: sorted(index[key]) for key in sorted(index)}
+
+
+def build_search_index(dataset: dict[str, Any]) -> dict[str, Any]:
+    """Map facet values and search tokens to the ids of the repos that have them."""
+    languages: dict[str, list[int]] = {}
+    topics: dict[str, list[int]] = {}
+    groups: dict[str, list[int]] = {}
+    tokens: dict[str, list[int]] = {}
+    archived: list[int] = []
+    forks: list[int] = []
+    indexed: set[int] = set()
+
+    for group in dataset["groups"]:
+        group_ids = groups.setdefault(str(group["slug"]), [])
+        for repo in group["repos"]:
+            record = repo if isinstance(repo, dict) else repo.to_json()
+            repo_id = record["id"]
+            group_ids.append(repo_id)
+            # A repo in several groups is indexed once; each id below is appended at most once.
+            if repo_id in indexed:
+                continue
+            indexed.add(repo_id)
+
+            if record.get("language"):
+                languages.setdefault(record["language"], []).append(repo_id)
+            repo_topics = record.get("topics") or []
+            for topic in repo_topics:
+                topics.setdefault(topic, []).append(repo_id)
+            if record.get("archived"):
+                archived.append(repo_id)
+            if record.get("fork"):
+                forks.append(repo_id)
+            for token in tokenize(record.get("full_name"), record.get("description"), *repo_topics):
+                tokens.setdefault(token, []).append(repo_id)
+
+    return {
+        "version": SEARCH_INDEX_VERSION,
+        "generated_at": dataset.get("generated_at"),
+        "facets": {
+            "language": postings(languages),
+            "topic": postings(topics),
+            "group": postings(groups),
+            "archived": sorted(archived),
+            "fork": sorted(forks),
+        },
+        "tokens": postings(tokens),
+    }
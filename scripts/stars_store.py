@@ -0,0 +1,210 @@
+"""Optional SQLite store for starred repos, list memberships and sync cursors."""
+
+from __future__ import annotations
+
+import argparse
+import json
+from collections.abc import Iterable
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+
+DEFAULT_STORE_PATH = Path(".cache/starred-lists/stars.sqlite3")
+REPO_COLUMNS = (
+    "id",
+    "full_name",
+    "html_url",
+    "description",
+    "stargazers_count",
+    "forks_count",
+    "language",
+    "archived",
+    "fork",
+    "topics",
+    "updated_at",
+)
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS repos (
+    id INTEGER PRIMARY KEY,
+    full_name TEXT NOT NULL,
+    html_url TEXT NOT NULL,
+    description TEXT,
+    stargazers_count INTEGER NOT NULL DEFAULT 0,
+    forks_count INTEGER NOT NULL DEFAULT 0,
+    language TEXT,
+    archived INTEGER NOT NULL DEFAULT 0,
+    fork INTEGER NOT NULL DEFAULT 0,
+    topics TEXT NOT NULL DEFAULT '[]',
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS repos_full_name ON repos (full_name COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS stars (
+    username TEXT NOT NULL,
+    repo_id INTEGER NOT NULL REFERENCES repos (id),
+    starred_at TEXT,
+    PRIMARY KEY (username, repo_id)
+);
+CREATE INDEX IF NOT EXISTS stars_by_time ON stars (username, starred_at DESC, repo_id DESC);
+CREATE TABLE IF NOT EXISTS lists (
+    username TEXT NOT NULL,
+    slug TEXT NOT NULL,
+    name TEXT NOT NULL,
+    url TEXT,
+    synced_at TEXT NOT NULL,
+    PRIMARY KEY (username, slug)
+);
+CREATE TABLE IF NOT EXISTS list_memberships (
+    username TEXT NOT NULL,
+    slug TEXT NOT NULL,
+    full_name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (username, slug, full_name)
+);
+CREATE TABLE IF NOT EXISTS sync_cursors (
+    username TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (username, name)
+);
+"""
+
+
+def utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class StarStore:
+    """Upsert-only system of record that both scripts write and the sync exports from."""
+
+    def __init__(self, path: Path) -> None:
+        import sqlite3
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._connection = sqlite3.connect(path)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __enter__(self) -> StarStore:
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.close()
+
+    def _upsert_repos(self, repos: list[dict[str, Any]]) -> None:
+        updates = ", ".join(f"{column} = excluded.{column}" for column in REPO_COLUMNS[1:])
+        self._connection.executemany(
+            f"INSERT INTO repos ({', '.join(REPO_COLUMNS)}) VALUES ({', '.join('?' * len(REPO_COLUMNS))}) "
+            f"ON CONFLICT (id) DO UPDATE SET {updates}",
+            (
+                tuple(
+                    json.dumps(repo.get("topics") or []) if column == "topics" else repo.get(column)
+                    for column in REPO_COLUMNS
+                )
+                for repo in repos
+            ),
+        )
+
+    def _upsert_stars(self, username: str, repos: list[dict[str, Any]]) -> None:
+        self._upsert_repos(repos)
+        self._connection.executemany(
+            "INSERT INTO stars (username, repo_id, starred_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (username, repo_id) DO UPDATE SET starred_at = excluded.starred_at",
+            ((username, repo["id"], repo.get("starred_at")) for repo in repos),
+        )
+
+    def replace_stars(self, username: str, repos: Iterable[dict[str, Any]], synced_at: str | None = None) -> None:
+        """Record a full sync: upsert every star and drop the ones no longer starred."""
+        repos = list(repos)
+        with self._connection:
+            self._upsert_stars(username, repos)
+            self._connection.execute("CREATE TEMP TABLE IF NOT EXISTS seen_repos (id INTEGER PRIMARY KEY)")
+            self._connection.execute("DELETE FROM seen_repos")
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO seen_repos (id) VALUES (?)", ((repo["id"],) for repo in repos)
+            )
+            self._connection.execute(
+                "DELETE FROM stars WHERE username = ? AND repo_id NOT IN (SELECT id FROM seen_repos)",
+                (username,),
+            )
+            self._set_cursor(username, "last_full_sync_at", synced_at or utc_now())
+
+    def add_stars(self, username: str, repos: Iterable[dict[str, Any]]) -> None:
+        """Record stars found by an incremental sync."""
+        with self._connection:
+            self._upsert_stars(username, list(repos))
+            self._set_cursor(username, "last_incremental_sync_at", utc_now())
+
+    def remove_stars(self, username: str, repo_ids: Iterable[int]) -> None:
+        """Drop stars found to be unstarred between full syncs."""
+        with self._connection:
+            self._connection.executemany(
+                "DELETE FROM stars WHERE username = ? AND repo_id = ?",
+                ((username, repo_id) for repo_id in repo_ids),
+            )
+
+    def load_stars(self, username: str) -> list[dict[str, Any]]:
+        """Return the user's stars newest first, shaped like the dataset's repo entries."""
+        rows = self._connection.execute(
+            f"SELECT {', '.join(f'repos.{column}' for column in REPO_COLUMNS)}, stars.starred_at "
+            "FROM stars JOIN repos ON repos.id = stars.repo_id "
+            "WHERE stars.username = ? ORDER BY stars.starred_at DESC, stars.repo_id DESC",
+            (username,),
+        )
+        repos: list[dict[str, Any]] = []
+        for row in rows:
+            repo = dict(zip(REPO_COLUMNS, row))
+            repo["archived"] = bool(repo["archived"])
+            repo["fork"] = bool(repo["fork"])
+            repo["topics"] = json.loads(repo["topics"])
+            repo["starred_at"] = row[-1]
+            repos.append(repo)
+        return repos
+
+    def replace_list(self, username: str, slug: str, name: str, url: str | None, repos: list[str]) -> None:
+        """Record the scraped members of one list, in page order."""
+        with self._connection:
+            self._connection.execute(
+                "INSERT INTO lists (username, slug, name, url, synced_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (username, slug) DO UPDATE SET "
+                "name = excluded.name, url = excluded.url, synced_at = excluded.synced_at",
+                (username, slug, name, url, utc_now()),
+            )
+            self._connection.execute("DELETE FROM list_memberships WHERE username = ? AND slug = ?", (username, slug))
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO list_memberships (username, slug, full_name, position) VALUES (?, ?, ?, ?)",
+                ((username, slug, full_name, position) for position, full_name in enumerate(repos)),
+            )
+
+    def _set_cursor(self, username: str, name: str, value: str) -> None:
+        self._connection.execute(
+            "INSERT INTO sync_cursors (username, name, value, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (username, name) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+            (username, name, value, utc_now()),
+        )
+
+    def get_cursor(self, username: str, name: str) -> str | None:
+        row = self._connection.execute(
+            "SELECT value FROM sync_cursors WHERE username = ? AND name = ?", (username, name)
+        ).fetchone()
+        return row[0] if row else None
+
+
+def add_store_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--store",
+        type=Path,
+        nargs="?",
+        const=DEFAULT_STORE_PATH,
+        default=None,
+        help=f"Also record results in a SQLite store (default path when given without one: {DEFAULT_STORE_PATH}).",
+    )
+
+
+def store_from_args(args: argparse.Namespace) -> StarStore | None:
+    return StarStore(args.store) if args.store else None
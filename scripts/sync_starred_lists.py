@@ -4,20 +4,93 @@
 from __future__ import annotations
 
 import argparse
+import contextvars
+import hashlib
 import json
 import os
+import re
 import sys
+import time
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field, replace
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
-from urllib.parse import quote
-from urllib.request import Request, urlopen
+from typing import TYPE_CHECKING, Any
+from urllib.error import HTTPError
+from urllib.parse import parse_qs, quote, urlparse
+
+from stars_http import (
+    ConnectionPool,
+    DeadlineExceeded,
+    ResponseCache,
+    add_cache_arguments,
+    add_scheduler_arguments,
+    cache_from_args,
+    configure_scheduler,
+    fetch,
+    open_url,
+    request_graphql,
+)
+from stars_changes import build_change_feed, summarize_change_feed
+from stars_enrich import add_enrich_arguments
+from stars_freshness import add_freshness_arguments, fresh_run_age, record_run
+from stars_metrics import METRICS, add_metrics_arguments, instrumented_run
+from stars_search import build_search_index
+from stars_store import StarStore, add_store_arguments, store_from_args
+from stars_output import (
+    PRECOMPRESSION_FORMATS,
+    SHARD_INDEX_NAME,
+    content_hash,
+    load_sharded_dataset,
+    written_with,
+    write_file_atomic,
+    write_json_stream,
+    write_sharded_dataset,
+)
+
+if TYPE_CHECKING:
+    from email.message import Message
 
 
 DEFAULT_MAPPING_PATH = Path("data/starred-lists.json")
 DEFAULT_OUTPUT_PATH = Path("public/data/starred-groups.json")
+DEFAULT_SHARD_DIR = Path("public/data/starred-groups")
+DEFAULT_MAPPING_INDEX_PATH = Path(".cache/starred-lists/mapping-index.json")
+MAPPING_INDEX_VERSION = 1
+OUTPUT_FORMATS = ("single", "sharded", "both")
 API_VERSION = "2022-11-28"
+GRAPHQL_URL = "https://api.github.com/graphql"
+BACKENDS = ("rest", "graphql")
 PER_PAGE = 100
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RECONCILE_AFTER_HOURS = 24.0
+LINK_LAST_RE = re.compile(r'<([^>]+)>;\s*rel="last"')
+# Only the fields normalize_repo keeps, ordered like the REST endpoint (newest star first).
+GRAPHQL_STARRED_QUERY = """
+query($login: String!, $first: Int!, $after: String) {
+  user(login: $login) {
+    starredRepositories(first: $first, after: $after, orderBy: {field: STARRED_AT, direction: DESC}) {
+      pageInfo { hasNextPage endCursor }
+      edges {
+        starredAt
+        node {
+          databaseId
+          nameWithOwner
+          url
+          description
+          stargazerCount
+          forkCount
+          primaryLanguage { name }
+          isArchived
+          isFork
+          repositoryTopics(first: 20) { nodes { topic { name } } }
+          updatedAt
+        }
+      }
+    }
+  }
+}
+"""
 
 
 def load_json_file(path: Path) -> Any:
@@ -25,7 +98,7 @@ def load_json_file(path: Path) -> Any:
         return json.load(handle)
 
 
-def request_json(url: str, token: str | None) -> Any:
+def api_headers(token: str | None) -> dict[str, str]:
     headers = {
         "Accept": "application/vnd.github.star+json",
         "X-GitHub-Api-Version": API_VERSION,
@@ -33,72 +106,407 @@ def request_json(url: str, token: str | None) -> Any:
     }
     if token:
         headers["Authorization"] = f"Bearer {token}"
+    return headers
+
+
+def request_json_with_headers(
+    url: str,
+    token: str | None,
+    cache: ResponseCache | None = None,
+    pool: ConnectionPool | None = None,
+) -> tuple[Any, Message]:
+    with METRICS.stage("request_json"):
+        response = fetch(url, api_headers(token), cache, pool)
+        with METRICS.stage("json_decode"):
+            payload = json.loads(response.body.decode("utf-8"))
+    return payload, response.headers
+
+
+def request_json(url: str, token: str | None, cache: ResponseCache | None = None) -> Any:
+    payload, _ = request_json_with_headers(url, token, cache=cache)
+    return payload
+
+
+def parse_last_page(link_header: str | None) -> int | None:
+    if not link_header:
+        return None
+    match = LINK_LAST_RE.search(link_header)
+    if not match:
+        return None
+    values = parse_qs(urlparse(match.group(1)).query).get("page")
+    if not values or not values[0].isdigit():
+        return None
+    return int(values[0])
+
+
+@dataclass(slots=True)
+class StarredRepo:
+    """One starred repository, kept compact until the dataset is serialized.
+
+    Language and topic strings are interned and identical topic tuples shared,
+    so large star sets hold one copy of each. ``details`` holds the fields
+    added by --enrich and is only serialized when set.
+    """
+
+    id: int
+    full_name: str
+    html_url: str
+    description: str | None
+    stargazers_count: int
+    forks_count: int
+    language: str | None
+    archived: bool
+    fork: bool
+    topics: tuple[str, ...]
+    updated_at: str | None
+    starred_at: str | None
+    details: dict[str, Any] | None = None
+
+    def to_json(self) -> dict[str, Any]:
+        """Return the StarredRepository shape the site expects."""
+        data = {
+            "id": self.id,
+            "full_name": self.full_name,
+            "html_url": self.html_url,
+            "description": self.description,
+            "stargazers_count": self.stargazers_count,
+            "forks_count": self.forks_count,
+            "language": self.language,
+            "archived": self.archived,
+            "fork": self.fork,
+            "topics": list(self.topics),
+            "updated_at": self.updated_at,
+            "starred_at": self.starred_at,
+        }
+        if self.details is not None:
+            data.update(self.details)
+        return data
+
 
-    request = Request(url, headers=headers)
-    with urlopen(request) as response:  # noqa: S310
-        return json.loads(response.read().decode("utf-8"))
+_TOPIC_TUPLES: dict[tuple[str, ...], tuple[str, ...]] = {}
 
 
-def normalize_repo(item: dict[str, Any]) -> dict[str, Any]:
+def intern_topics(topics: list[Any]) -> tuple[str, ...]:
+    key = tuple(sys.intern(str(topic)) for topic in topics)
+    return _TOPIC_TUPLES.setdefault(key, key)
+
+
+def normalize_repo(item: dict[str, Any]) -> StarredRepo:
     if "repo" in item:
         repo_data = item["repo"]
-        starred_at = item.get("starred_at")
     else:
         repo_data = item
-        starred_at = None
+    starred_at = item.get("starred_at")
 
     topics = repo_data.get("topics") or []
     if not isinstance(topics, list):
         topics = []
+    language = repo_data.get("language")
 
-    return {
-        "id": repo_data["id"],
-        "full_name": repo_data["full_name"],
-        "html_url": repo_data["html_url"],
-        "description": repo_data.get("description"),
-        "stargazers_count": repo_data.get("stargazers_count", 0),
-        "forks_count": repo_data.get("forks_count", 0),
-        "language": repo_data.get("language"),
-        "archived": bool(repo_data.get("archived", False)),
-        "fork": bool(repo_data.get("fork", False)),
-        "topics": [str(topic) for topic in topics],
-        "updated_at": repo_data.get("updated_at"),
-        "starred_at": starred_at,
-    }
+    return StarredRepo(
+        id=repo_data["id"],
+        full_name=repo_data["full_name"],
+        html_url=repo_data["html_url"],
+        description=repo_data.get("description"),
+        stargazers_count=repo_data.get("stargazers_count", 0),
+        forks_count=repo_data.get("forks_count", 0),
+        language=sys.intern(language) if isinstance(language, str) else language,
+        archived=bool(repo_data.get("archived", False)),
+        fork=bool(repo_data.get("fork", False)),
+        topics=intern_topics(topics),
+        updated_at=repo_data.get("updated_at"),
+        starred_at=starred_at,
+    )
 
 
-def fetch_all_starred_repos(username: str, token: str | None) -> list[dict[str, Any]]:
-    repos: list[dict[str, Any]] = []
-    page = 1
+def starred_page_url(username: str, page: int) -> str:
+    return (
+        f"https://api.github.com/users/{quote(username)}/starred"
+        f"?per_page={PER_PAGE}&page={page}&sort=created&direction=desc"
+    )
 
-    while True:
-        url = (
-            f"https://api.github.com/users/{quote(username)}/starred"
-            f"?per_page={PER_PAGE}&page={page}&sort=created&direction=desc"
-        )
-        payload = request_json(url, token)
 
-        if not isinstance(payload, list):
-            raise RuntimeError("Unexpected GitHub API response format.")
+def fetch_starred_page(
+    username: str,
+    page: int,
+    token: str | None,
+    cache: ResponseCache | None = None,
+    pool: ConnectionPool | None = None,
+) -> tuple[list[dict[str, Any]], Message]:
+    payload, headers = request_json_with_headers(starred_page_url(username, page), token, cache, pool)
+    if not isinstance(payload, list):
+        raise RuntimeError("Unexpected GitHub API response format.")
+    return [item for item in payload if isinstance(item, dict)], headers
+
+
+def fetch_all_starred_repos(
+    username: str,
+    token: str | None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    cache: ResponseCache | None = None,
+    pool: ConnectionPool | None = None,
+) -> list[StarredRepo]:
+    first_page, headers = fetch_starred_page(username, 1, token, cache, pool)
+    repos: list[StarredRepo] = [normalize_repo(item) for item in first_page]
+    if len(first_page) < PER_PAGE:
+        return repos
+
+    last_page = parse_last_page(headers.get("Link"))
+    if concurrency > 1 and last_page is not None:
+        # Pages are fetched out of order but collected by page number, so the
+        # result keeps the API's sort=created&direction=desc ordering. Each one
+        # runs in a copy of the caller's context so batch runs know its account.
+        from concurrent.futures import ThreadPoolExecutor
+
+        context = contextvars.copy_context()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pages = executor.map(
+                lambda page: context.copy().run(fetch_starred_page, username, page, token, cache, pool)[0],
+                range(2, last_page + 1),
+            )
+            for payload in pages:
+                repos.extend(normalize_repo(item) for item in payload)
+        return repos
+
+    for payload in iter_starred_pages(username, token, cache, pool, start_page=2):
+        repos.extend(normalize_repo(item) for item in payload)
+
+    return repos
+
 
+def iter_starred_pages(
+    username: str,
+    token: str | None,
+    cache: ResponseCache | None = None,
+    pool: ConnectionPool | None = None,
+    start_page: int = 1,
+) -> Iterator[list[dict[str, Any]]]:
+    page = start_page
+    while True:
+        payload, _ = fetch_starred_page(username, page, token, cache, pool)
         if not payload:
-            break
+            return
 
-        repos.extend(normalize_repo(item) for item in payload if isinstance(item, dict))
+        yield payload
 
         if len(payload) < PER_PAGE:
-            break
+            return
 
         page += 1
 
+
+def star_key(repo: StarredRepo) -> tuple[str, str | None]:
+    return repo.full_name.lower(), repo.starred_at
+
+
+def graphql_edge_to_item(edge: dict[str, Any]) -> dict[str, Any]:
+    """Reshape a starredRepositories edge like a REST star item for normalize_repo."""
+    node = edge.get("node") or {}
+    language = node.get("primaryLanguage") or {}
+    topics = [
+        topic_node["topic"]["name"]
+        for topic_node in (node.get("repositoryTopics") or {}).get("nodes") or []
+        if isinstance(topic_node, dict) and isinstance(topic_node.get("topic"), dict)
+    ]
+    return {
+        "starred_at": edge.get("starredAt"),
+        "repo": {
+            "id": node["databaseId"],
+            "full_name": node["nameWithOwner"],
+            "html_url": node["url"],
+            "description": node.get("description"),
+            "stargazers_count": node.get("stargazerCount", 0),
+            "forks_count": node.get("forkCount", 0),
+            "language": language.get("name"),
+            "archived": node.get("isArchived", False),
+            "fork": node.get("isFork", False),
+            "topics": topics,
+            "updated_at": node.get("updatedAt"),
+        },
+    }
+
+
+def iter_graphql_starred_pages(
+    username: str,
+    token: str,
+    url: str = GRAPHQL_URL,
+    pool: ConnectionPool | None = None,
+) -> Iterator[list[dict[str, Any]]]:
+    cursor: str | None = None
+    while True:
+        variables = {"login": username, "first": PER_PAGE, "after": cursor}
+        data = request_graphql(url, GRAPHQL_STARRED_QUERY, variables, token, pool)
+        user = data.get("user")
+        if not isinstance(user, dict):
+            raise RuntimeError(f"GitHub user '{username}' was not found.")
+        connection = user.get("starredRepositories") or {}
+        edges = [edge for edge in connection.get("edges") or [] if isinstance(edge, dict) and edge.get("node")]
+        if edges:
+            yield [graphql_edge_to_item(edge) for edge in edges]
+
+        page_info = connection.get("pageInfo") or {}
+        cursor = page_info.get("endCursor")
+        if not page_info.get("hasNextPage") or not cursor:
+            return
+
+
+def fetch_new_starred_repos(
+    pages: Iterable[list[dict[str, Any]]],
+    known_stars: set[tuple[str, str | None]],
+) -> list[StarredRepo]:
+    """Consume star pages newest first, stopping at the first star already known."""
+    repos: list[StarredRepo] = []
+    for payload in pages:
+        for item in payload:
+            repo = normalize_repo(item)
+            if star_key(repo) in known_stars:
+                return repos
+            repos.append(repo)
     return repos
 
 
-def build_grouped_dataset(mapping: dict[str, Any], starred_repos: list[dict[str, Any]]) -> tuple[dict[str, Any], list[str]]:
-    username = mapping.get("username")
-    if not isinstance(username, str) or not username:
-        raise ValueError("Mapping file must define a non-empty 'username'.")
+def load_previous_repos(dataset: Any) -> list[StarredRepo]:
+    """Rebuild the flat star list, newest first, from a grouped dataset."""
+    if not isinstance(dataset, dict) or not isinstance(dataset.get("groups"), list):
+        return []
+
+    repos_by_id: dict[Any, StarredRepo] = {}
+    for group in dataset["groups"]:
+        if not isinstance(group, dict) or not isinstance(group.get("repos"), list):
+            continue
+        for repo in group["repos"]:
+            if isinstance(repo, dict) and "id" in repo and repo.get("full_name") and repo["id"] not in repos_by_id:
+                repos_by_id[repo["id"]] = normalize_repo(repo)
+
+    return sorted(repos_by_id.values(), key=lambda repo: repo.starred_at or "", reverse=True)
+
+
+def needs_full_reconcile(last_full_sync_at: Any, reconcile_after_hours: float) -> bool:
+    if not isinstance(last_full_sync_at, str):
+        return True
+    try:
+        last_full_sync = datetime.fromisoformat(last_full_sync_at)
+    except ValueError:
+        return True
+    age = datetime.now(timezone.utc) - last_full_sync
+    return age.total_seconds() >= reconcile_after_hours * 3600
+
+
+def merge_new_stars(new_repos: list[StarredRepo], previous_repos: list[StarredRepo]) -> list[StarredRepo]:
+    new_ids = {repo.id for repo in new_repos}
+    return new_repos + [repo for repo in previous_repos if repo.id not in new_ids]
+
+
+def poll_starred_page(
+    username: str,
+    token: str | None,
+    etag: str | None,
+    pool: ConnectionPool | None = None,
+) -> tuple[list[dict[str, Any]] | None, str | None]:
+    """Fetch the newest stars page unless it still matches etag; None means it is unchanged.
+
+    GitHub does not count a 304 against the rate limit, so an idle poll is
+    close to free.
+    """
+    headers = api_headers(token)
+    if etag:
+        headers["If-None-Match"] = etag
+    METRICS.incr("watch_polls")
+    try:
+        with METRICS.stage("request_json"):
+            response = open_url(starred_page_url(username, 1), headers, pool)
+    except HTTPError as error:
+        if error.code != 304 or not etag:
+            raise
+        METRICS.incr("watch_not_modified")
+        return None, etag
+    payload = json.loads(response.body.decode("utf-8"))
+    if not isinstance(payload, list):
+        raise RuntimeError("Unexpected GitHub API response format.")
+    return [item for item in payload if isinstance(item, dict)], response.headers.get("ETag")
+
+
+def apply_newest_stars(
+    starred_repos: list[StarredRepo],
+    newest: list[StarredRepo],
+    complete: bool,
+) -> tuple[list[StarredRepo], list[StarredRepo], list[StarredRepo]]:
+    """Merge the newest stars, in API order, into the star list.
+
+    Stars in ``newest`` replace their old entries and keep their enrichment
+    details. Known stars newer than the oldest of them that it lacks were
+    unstarred, and so is every missing star when ``complete`` says ``newest``
+    is the whole list. Return the new list, the stars that were added or
+    changed and the ones that were unstarred.
+    """
+    newest_ids = {repo.id for repo in newest}
+    cutoff = newest[-1].starred_at if newest and not complete else None
+    replaced: dict[int, StarredRepo] = {}
+    kept: list[StarredRepo] = []
+    removed: list[StarredRepo] = []
+    for repo in starred_repos:
+        if repo.id in newest_ids:
+            replaced[repo.id] = repo
+        elif complete or (cutoff is not None and repo.starred_at is not None and repo.starred_at > cutoff):
+            removed.append(repo)
+        else:
+            kept.append(repo)
 
+    changed: list[StarredRepo] = []
+    for repo in newest:
+        old = replaced.get(repo.id)
+        if old is not None:
+            repo.details = old.details
+        if repo != old:
+            changed.append(repo)
+    return newest + kept, changed, removed
+
+
+@dataclass
+class CompiledMapping:
+    """Mapping file reduced to group ordinals and repo/owner lookup tables.
+
+    Groups are listed in output order with the unlisted group last; ``exact``
+    maps a lowercased ``owner/repo`` and ``owners`` a lowercased owner from an
+    ``owner/*`` rule to the sorted ordinals of the groups it belongs to.
+    """
+
+    groups: list[dict[str, str]]
+    exact: dict[str, list[int]] = field(default_factory=dict)
+    owners: dict[str, list[int]] = field(default_factory=dict)
+    warnings: list[str] = field(default_factory=list)
+
+    def ordinals_for(self, repo_key: str) -> list[int]:
+        exact = self.exact.get(repo_key)
+        owner_ordinals = self.owners.get(repo_key.partition("/")[0]) if self.owners else None
+        if owner_ordinals is None:
+            return exact or []
+        if exact is None:
+            return owner_ordinals
+        return sorted(set(exact).union(owner_ordinals))
+
+    def to_json(self, mapping_hash: str) -> dict[str, Any]:
+        return {
+            "version": MAPPING_INDEX_VERSION,
+            "mapping_hash": mapping_hash,
+            "groups": self.groups,
+            "exact": self.exact,
+            "owners": self.owners,
+            "warnings": self.warnings,
+        }
+
+    @classmethod
+    def from_json(cls, payload: Any, mapping_hash: str) -> CompiledMapping | None:
+        if (
+            not isinstance(payload, dict)
+            or payload.get("version") != MAPPING_INDEX_VERSION
+            or payload.get("mapping_hash") != mapping_hash
+        ):
+            return None
+        return cls(payload["groups"], payload["exact"], payload["owners"], payload["warnings"])
+
+
+def compile_mapping(mapping: dict[str, Any]) -> CompiledMapping:
     configured_lists = mapping.get("lists")
     if not isinstance(configured_lists, list):
         raise ValueError("Mapping file must define 'lists' as an array.")
@@ -108,17 +516,10 @@ def build_grouped_dataset(mapping: dict[str, Any], starred_repos: list[dict[str,
         raise ValueError("'unlisted' must be an object when provided.")
 
     unlisted_slug = str(unlisted.get("slug") or "to-classify")
-    unlisted_group = {
-        "slug": unlisted_slug,
-        "name": str(unlisted.get("name") or "To Classify"),
-        "description": str(unlisted.get("description") or "New stars not assigned to a list yet."),
-        "repos": [],
-    }
-
-    groups: dict[str, dict[str, Any]] = {}
-    repo_to_group_slugs: dict[str, set[str]] = {}
-    warnings: list[str] = []
-    ordered_slugs: list[str] = []
+    compiled = CompiledMapping(groups=[])
+    seen_slugs: set[str] = set()
+    exact: dict[str, set[int]] = {}
+    owners: dict[str, set[int]] = {}
 
     for entry in configured_lists:
         if not isinstance(entry, dict):
@@ -129,17 +530,16 @@ def build_grouped_dataset(mapping: dict[str, Any], starred_repos: list[dict[str,
         if not slug or not name:
             continue
 
-        if slug in groups:
-            warnings.append(f"Duplicate list slug '{slug}' in mapping file.")
+        if slug in seen_slugs:
+            compiled.warnings.append(f"Duplicate list slug '{slug}' in mapping file.")
             continue
+        if slug == unlisted_slug:
+            compiled.warnings.append(f"List slug '{slug}' is reserved for unlisted stars.")
+            continue
+        seen_slugs.add(slug)
 
-        groups[slug] = {
-            "slug": slug,
-            "name": name,
-            "description": str(entry.get("description") or ""),
-            "repos": [],
-        }
-        ordered_slugs.append(slug)
+        ordinal = len(compiled.groups)
+        compiled.groups.append({"slug": slug, "name": name, "description": str(entry.get("description") or "")})
 
         mapped_repos = entry.get("repos") or []
         if not isinstance(mapped_repos, list):
@@ -151,33 +551,207 @@ def build_grouped_dataset(mapping: dict[str, Any], starred_repos: list[dict[str,
             normalized_name = repo_name.strip().lower()
             if not normalized_name:
                 continue
-            if normalized_name not in repo_to_group_slugs:
-                repo_to_group_slugs[normalized_name] = set()
-            repo_to_group_slugs[normalized_name].add(slug)
+            owner, _, repo = normalized_name.partition("/")
+            if repo == "*":
+                owners.setdefault(owner, set()).add(ordinal)
+            else:
+                exact.setdefault(normalized_name, set()).add(ordinal)
+
+    compiled.groups.append(
+        {
+            "slug": unlisted_slug,
+            "name": str(unlisted.get("name") or "To Classify"),
+            "description": str(unlisted.get("description") or "New stars not assigned to a list yet."),
+        }
+    )
+    compiled.exact = {key: sorted(ordinals) for key, ordinals in exact.items()}
+    compiled.owners = {key: sorted(ordinals) for key, ordinals in owners.items()}
+    return compiled
+
+
+def mapping_file_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def load_compiled_mapping(
+    mapping: dict[str, Any], mapping_hash: str, index_path: Path | None
+) -> CompiledMapping:
+    """Return the compiled mapping from the on-disk index, rebuilding it when the mapping changed."""
+    if index_path is not None:
+        try:
+            with index_path.open("r", encoding="utf-8") as handle:
+                compiled = CompiledMapping.from_json(json.load(handle), mapping_hash)
+        except (OSError, ValueError, KeyError):
+            compiled = None
+        if compiled is not None:
+            METRICS.incr("mapping_index_hits")
+            return compiled
+
+    METRICS.incr("mapping_index_misses")
+    compiled = compile_mapping(mapping)
+    if index_path is not None:
+        data = json.dumps(compiled.to_json(mapping_hash), separators=(",", ":")).encode("utf-8")
+        try:
+            write_file_atomic(index_path, data)
+        except OSError as error:
+            print(f"Warning: could not save the mapping index: {error}", file=sys.stderr)
+    return compiled
+
+
+def build_grouped_dataset(
+    mapping: dict[str, Any],
+    starred_repos: list[StarredRepo],
+    last_full_sync_at: str | None = None,
+    compiled: CompiledMapping | None = None,
+) -> tuple[dict[str, Any], list[str]]:
+    username = mapping.get("username")
+    if not isinstance(username, str) or not username:
+        raise ValueError("Mapping file must define a non-empty 'username'.")
+
+    if compiled is None:
+        compiled = compile_mapping(mapping)
 
-    groups[unlisted_slug] = unlisted_group
-    ordered_slugs.append(unlisted_slug)
+    group_repos: list[list[StarredRepo]] = [[] for _ in compiled.groups]
+    unlisted_repos = group_repos[-1]
 
     for repo in starred_repos:
-        full_name = str(repo.get("full_name") or "").strip()
+        full_name = repo.full_name.strip()
         if not full_name:
             continue
-        repo_key = full_name.lower()
-        assigned_slugs = repo_to_group_slugs.get(repo_key)
-        if assigned_slugs:
-            for slug in ordered_slugs:
-                if slug in assigned_slugs:
-                    groups[slug]["repos"].append(repo)
+        ordinals = compiled.ordinals_for(full_name.lower())
+        if ordinals:
+            for ordinal in ordinals:
+                group_repos[ordinal].append(repo)
         else:
-            groups[unlisted_slug]["repos"].append(repo)
+            unlisted_repos.append(repo)
 
-    dataset = {
+    dataset: dict[str, Any] = {
         "username": username,
         "generated_at": datetime.now(timezone.utc).isoformat(),
-        "total_repos": len(starred_repos),
-        "groups": [groups[slug] for slug in ordered_slugs if slug in groups],
     }
-    return dataset, warnings
+    if last_full_sync_at is not None:
+        dataset["last_full_sync_at"] = last_full_sync_at
+    dataset["total_repos"] = len(starred_repos)
+    dataset["groups"] = [{**group, "repos": repos} for group, repos in zip(compiled.groups, group_repos)]
+    return dataset, list(compiled.warnings)
+
+
+def add_sync_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=DEFAULT_OUTPUT_PATH,
+        help=f"Path to generated grouped JSON (default: {DEFAULT_OUTPUT_PATH})",
+    )
+    parser.add_argument(
+        "--token-env",
+        type=str,
+        default="GITHUB_TOKEN",
+        help="Environment variable name containing a GitHub token (default: GITHUB_TOKEN).",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Max parallel API page requests, 1 disables parallel fetching (default: {DEFAULT_CONCURRENCY}).",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="rest",
+        help=(
+            "Fetch stars from the REST starred endpoint or through GraphQL, which only "
+            "transfers the fields kept in the dataset and requires a token (default: rest)."
+        ),
+    )
+    parser.add_argument(
+        "--graphql-url",
+        type=str,
+        default=GRAPHQL_URL,
+        help=f"GitHub GraphQL endpoint used by --backend graphql (default: {GRAPHQL_URL}).",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=(
+            "Only fetch stars newer than the ones in the existing output and merge them in. "
+            "A full sync still runs when the last one is older than --reconcile-after."
+        ),
+    )
+    parser.add_argument(
+        "--reconcile-after",
+        type=float,
+        default=DEFAULT_RECONCILE_AFTER_HOURS,
+        help=(
+            "Hours after which --incremental falls back to a full sync to drop unstarred repos "
+            f"and refresh metadata (default: {DEFAULT_RECONCILE_AFTER_HOURS:g})."
+        ),
+    )
+    parser.add_argument(
+        "--format",
+        choices=OUTPUT_FORMATS,
+        default="single",
+        help=(
+            "Write one grouped JSON file (single), an index plus one compact file per group "
+            "under --shard-dir (sharded), or both (default: single)."
+        ),
+    )
+    parser.add_argument(
+        "--shard-dir",
+        type=Path,
+        default=DEFAULT_SHARD_DIR,
+        help=f"Directory for the sharded output (default: {DEFAULT_SHARD_DIR}).",
+    )
+    parser.add_argument(
+        "--precompress",
+        action="append",
+        choices=PRECOMPRESSION_FORMATS,
+        default=[],
+        help="Also write precompressed copies of every output file; repeat for several formats.",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Write JSON without indentation; smaller files, same content.",
+    )
+    parser.add_argument(
+        "--mapping-index",
+        type=Path,
+        default=DEFAULT_MAPPING_INDEX_PATH,
+        help=(
+            "Where to cache the compiled mapping index, rebuilt whenever the mapping file "
+            f"changes; --no-cache skips it (default: {DEFAULT_MAPPING_INDEX_PATH})."
+        ),
+    )
+    parser.add_argument(
+        "--changes",
+        type=Path,
+        default=None,
+        help=(
+            "Where to write the change feed against the previous dataset (default: next to the "
+            "output, e.g. public/data/starred-groups.changes.json)."
+        ),
+    )
+    parser.add_argument(
+        "--no-changes",
+        action="store_true",
+        help="Do not write the change feed.",
+    )
+    parser.add_argument(
+        "--search-index",
+        type=Path,
+        default=None,
+        help=(
+            "Where to write the facet and token index of the dataset (default: next to the "
+            "output, e.g. public/data/starred-groups.search.json)."
+        ),
+    )
+    parser.add_argument(
+        "--no-search-index",
+        action="store_true",
+        help="Do not write the search index.",
+    )
+    add_enrich_arguments(parser)
 
 
 def parse_args() -> argparse.Namespace:
@@ -190,38 +764,330 @@ def parse_args() -> argparse.Namespace:
         default=DEFAULT_MAPPING_PATH,
         help=f"Path to starred mapping JSON (default: {DEFAULT_MAPPING_PATH})",
     )
-    parser.add_argument(
-        "--output",
-        type=Path,
-        default=DEFAULT_OUTPUT_PATH,
-        help=f"Path to generated grouped JSON (default: {DEFAULT_OUTPUT_PATH})",
-    )
     parser.add_argument(
         "--username",
         type=str,
         default=None,
         help="Override GitHub username defined in mapping file.",
     )
+    add_sync_arguments(parser)
     parser.add_argument(
-        "--token-env",
-        type=str,
-        default="GITHUB_TOKEN",
-        help="Environment variable name containing a GitHub token (default: GITHUB_TOKEN).",
+        "--unchanged-exit-code",
+        type=int,
+        default=0,
+        help=(
+            "Exit status when the dataset is unchanged apart from generated_at and nothing was "
+            "written, e.g. 3 so a pipeline can skip the build and deploy (default: 0)."
+        ),
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Rebuild the outputs from --store without contacting GitHub.",
     )
+    parser.add_argument(
+        "--watch",
+        type=float,
+        default=0.0,
+        metavar="SECONDS",
+        help=(
+            "Keep running after the sync and poll the newest stars page every SECONDS with conditional "
+            "requests, rewriting the outputs only when it changes (default: 0, sync once)."
+        ),
+    )
+    add_freshness_arguments(parser)
+    add_store_arguments(parser)
+    add_cache_arguments(parser)
+    add_scheduler_arguments(parser)
+    add_metrics_arguments(parser)
     return parser.parse_args()
 
 
+def load_previous_output(args: argparse.Namespace) -> Any:
+    try:
+        if args.format != "sharded" and args.output.exists():
+            return load_json_file(args.output)
+        if args.format != "single":
+            return load_sharded_dataset(args.shard_dir)
+    except (OSError, ValueError) as error:
+        print(f"Ignoring unreadable previous output: {error}", file=sys.stderr)
+    return None
+
+
+def output_paths(args: argparse.Namespace) -> list[Path]:
+    paths = []
+    if args.format != "sharded":
+        paths.append(args.output)
+    if args.format != "single":
+        paths.append(args.shard_dir / SHARD_INDEX_NAME)
+    if not args.no_search_index:
+        paths.append(search_index_path(args))
+    return paths
+
+
+def outputs_exist(args: argparse.Namespace) -> bool:
+    return all(path.exists() for path in output_paths(args))
+
+
+def outputs_match_options(args: argparse.Namespace) -> bool:
+    """Whether the outputs on disk were written with the current --compact and --precompress."""
+    indent = None if args.compact else 2
+    paths = [(search_index_path(args), None)] if not args.no_search_index else []
+    if args.format != "sharded":
+        paths.append((args.output, indent))
+    if args.format != "single":
+        paths.append((args.shard_dir / SHARD_INDEX_NAME, indent))
+    return all(written_with(path, args.precompress, path_indent) for path, path_indent in paths)
+
+
+def sibling_output_path(args: argparse.Namespace, suffix: str) -> Path:
+    if args.format == "sharded":
+        return args.shard_dir.with_name(f"{args.shard_dir.name}{suffix}")
+    return args.output.with_name(f"{args.output.stem}{suffix}")
+
+
+def changes_path(args: argparse.Namespace) -> Path:
+    return args.changes if args.changes is not None else sibling_output_path(args, ".changes.json")
+
+
+def search_index_path(args: argparse.Namespace) -> Path:
+    return args.search_index if args.search_index is not None else sibling_output_path(args, ".search.json")
+
+
+def load_stored_stars(store: StarStore, username: str) -> tuple[list[StarredRepo], str | None]:
+    with METRICS.stage("store_load"):
+        repos = [normalize_repo(row) for row in store.load_stars(username)]
+    return repos, store.get_cursor(username, "last_full_sync_at")
+
+
+def sync_stars(
+    args: argparse.Namespace,
+    username: str,
+    token: str | None,
+    cache: ResponseCache | None,
+    pool: ConnectionPool,
+    previous: Any,
+    store: StarStore | None,
+) -> tuple[list[StarredRepo], str | None]:
+    """Fetch stars from GitHub, fully or incrementally; return them with the reconcile time."""
+    if store is not None:
+        last_full_sync_at = store.get_cursor(username, "last_full_sync_at")
+    else:
+        last_full_sync_at = previous.get("last_full_sync_at") if isinstance(previous, dict) else None
+
+    if args.backend == "graphql":
+        pages = iter_graphql_starred_pages(username, token, args.graphql_url, pool)
+    else:
+        pages = iter_starred_pages(username, token, cache, pool)
+
+    if not args.incremental or needs_full_reconcile(last_full_sync_at, args.reconcile_after):
+        if args.backend == "graphql":
+            starred_repos = [normalize_repo(item) for page in pages for item in page]
+        else:
+            starred_repos = fetch_all_starred_repos(username, token, max(1, args.concurrency), cache, pool)
+        synced_at = datetime.now(timezone.utc).isoformat()
+        if store is not None:
+            with METRICS.stage("store_write"):
+                store.replace_stars(username, (repo.to_json() for repo in starred_repos), synced_at)
+        # Only incremental runs need the reconcile timestamp; leaving it out otherwise
+        # keeps unchanged full syncs byte-identical apart from generated_at.
+        return starred_repos, synced_at if args.incremental else None
+
+    if store is not None:
+        previous_repos, _ = load_stored_stars(store, username)
+    else:
+        previous_repos = load_previous_repos(previous)
+    known_stars = {star_key(repo) for repo in previous_repos}
+    new_repos = fetch_new_starred_repos(pages, known_stars)
+    print(f"Incremental sync found {len(new_repos)} new starred repositories.")
+    if store is not None:
+        with METRICS.stage("store_write"):
+            store.add_stars(username, (repo.to_json() for repo in new_repos))
+    return merge_new_stars(new_repos, previous_repos), last_full_sync_at
+
+
+def enrich_stars(
+    args: argparse.Namespace,
+    starred_repos: list[StarredRepo],
+    token: str | None,
+    pool: ConnectionPool,
+    offline: bool = False,
+) -> None:
+    """Attach cached or freshly fetched details when --enrich is set; offline runs only use the cache."""
+    if not args.enrich:
+        return
+    from stars_enrich import enrich_repos
+
+    with METRICS.stage("enrich"):
+        enrich_repos(
+            starred_repos,
+            token,
+            args.graphql_url,
+            pool,
+            None if args.no_cache else args.enrich_cache,
+            args.enrich_ttl,
+            args.enrich_batch_size,
+            max(1, args.concurrency),
+            offline=offline,
+        )
+
+
+def build_dataset(
+    args: argparse.Namespace,
+    mapping: dict[str, Any],
+    mapping_hash: str,
+    starred_repos: list[StarredRepo],
+    last_full_sync_at: str | None,
+) -> tuple[dict[str, Any], list[str]]:
+    with METRICS.stage("build_grouped_dataset"):
+        mapping_index_path = None if args.no_cache else args.mapping_index
+        compiled = load_compiled_mapping(mapping, mapping_hash, mapping_index_path)
+        return build_grouped_dataset(mapping, starred_repos, last_full_sync_at, compiled)
+
+
+def write_outputs(
+    args: argparse.Namespace,
+    mapping: dict[str, Any],
+    dataset: dict[str, Any],
+    warnings: list[str],
+    previous: Any,
+) -> int:
+    """Write the grouped dataset unless it matches the previous output; return the exit status."""
+    username = dataset["username"]
+    total_repos = dataset["total_repos"]
+    if (
+        previous is not None
+        and outputs_exist(args)
+        and outputs_match_options(args)
+        and content_hash(previous) == content_hash(dataset)
+    ):
+        print(f"Fetched {total_repos} starred repositories for {username}.")
+        print("Grouped dataset is unchanged, skipped writing outputs.")
+        report_mapping_status(mapping, dataset, warnings)
+        return args.unchanged_exit_code
+
+    try:
+        with METRICS.stage("write_output"):
+            if args.format != "sharded":
+                write_json_stream(args.output, dataset, args.precompress, None if args.compact else 2)
+            if args.format != "single":
+                index_path = write_sharded_dataset(dataset, args.shard_dir, args.precompress, args.compact)
+        if not args.no_search_index:
+            with METRICS.stage("write_search_index"):
+                # Posting lists are long integer arrays, so the index is always written compact.
+                write_json_stream(search_index_path(args), build_search_index(dataset), args.precompress, None)
+    except (OSError, RuntimeError, ValueError) as error:
+        print(f"Failed to write grouped dataset: {error}", file=sys.stderr)
+        return 1
+
+    print(f"Fetched {total_repos} starred repositories for {username}.")
+    if args.format != "sharded":
+        print(f"Wrote grouped dataset to {args.output}.")
+    if args.format != "single":
+        print(f"Wrote sharded dataset index to {index_path}.")
+    if not args.no_search_index:
+        print(f"Wrote search index to {search_index_path(args)}.")
+
+    if not args.no_changes and isinstance(previous, dict):
+        # The feed pairs with the dataset through generated_at; unchanged runs keep the last one.
+        feed = build_change_feed(previous, dataset)
+        try:
+            with METRICS.stage("write_changes"):
+                write_json_stream(changes_path(args), feed, [], None if args.compact else 2)
+        except OSError as error:
+            print(f"Failed to write change feed: {error}", file=sys.stderr)
+            return 1
+        print(f"Changes since the previous sync: {summarize_change_feed(feed)}; wrote {changes_path(args)}.")
+
+    report_mapping_status(mapping, dataset, warnings)
+    return 0
+
+
+def report_mapping_status(mapping: dict[str, Any], dataset: dict[str, Any], warnings: list[str]) -> None:
+    """Print the unassigned count and mapping warnings, whether or not the outputs were written."""
+    unlisted_group = next(
+        (group for group in dataset["groups"] if group.get("slug") == (mapping.get("unlisted", {}) or {}).get("slug", "to-classify")),
+        None,
+    )
+    if isinstance(unlisted_group, dict):
+        unlisted_repos = unlisted_group.get("repos", [])
+        if isinstance(unlisted_repos, list) and unlisted_repos:
+            print(f"{len(unlisted_repos)} repositories are still unassigned.")
+
+    for warning in warnings:
+        print(f"Warning: {warning}", file=sys.stderr)
+
+
 def main() -> int:
     args = parse_args()
+    with instrumented_run("sync_starred_lists", args):
+        return run(args)
 
+
+def skip_if_fresh(args: argparse.Namespace) -> bool:
+    fresh_age = fresh_run_age(args, "sync_starred_lists", args.mapping, output_paths(args))
+    if fresh_age is None:
+        return False
+    print(f"Last sync finished {fresh_age:.0f}s ago and the mapping is unchanged, skipped syncing.")
+    return True
+
+
+def check_run_options(args: argparse.Namespace, token: str | None) -> bool:
+    if args.offline and not args.store:
+        print("--offline needs a --store to export from.", file=sys.stderr)
+        return False
+    if args.backend == "graphql" and not token and not args.offline:
+        print(f"The GraphQL backend requires a token in ${args.token_env}.", file=sys.stderr)
+        return False
+    if args.enrich and not token and not args.offline:
+        print(f"--enrich requires a token in ${args.token_env}.", file=sys.stderr)
+        return False
+    return True
+
+
+def run(args: argparse.Namespace) -> int:
     if not args.mapping.exists():
         print(f"Mapping file not found: {args.mapping}", file=sys.stderr)
         return 1
+    if args.watch > 0 and args.offline:
+        print("--watch polls GitHub and cannot be combined with --offline.", file=sys.stderr)
+        return 1
+    if args.watch <= 0 and skip_if_fresh(args):
+        return args.unchanged_exit_code
+
+    token = os.environ.get(args.token_env)
+    if not check_run_options(args, token):
+        return 1
+
+    configure_scheduler(args)
+    cache = cache_from_args(args)
+    pool = ConnectionPool(max_idle_per_host=max(1, args.concurrency))
+    store = store_from_args(args)
+    try:
+        if args.watch > 0:
+            return watch(args, token, cache, pool, store)
+        return sync_account(args, token, cache, pool, store)
+    finally:
+        if store is not None:
+            store.close()
+
 
-    mapping = load_json_file(args.mapping)
+def load_mapping(args: argparse.Namespace) -> tuple[dict[str, Any], str, str] | None:
+    """Read the mapping with its hash and username, or report why it cannot be used and return None."""
+    if not args.mapping.exists():
+        print(f"Mapping file not found: {args.mapping}", file=sys.stderr)
+        return None
+
+    try:
+        mapping_data = args.mapping.read_bytes()
+        mapping = json.loads(mapping_data)
+    except (OSError, ValueError) as error:
+        print(f"Could not read mapping file {args.mapping}: {error}", file=sys.stderr)
+        return None
     if not isinstance(mapping, dict):
         print("Mapping file must be a JSON object.", file=sys.stderr)
-        return 1
+        return None
+    mapping_hash = mapping_file_hash(mapping_data)
 
     if args.username:
         mapping["username"] = args.username
@@ -229,37 +1095,170 @@ def main() -> int:
     username = mapping.get("username")
     if not isinstance(username, str) or not username:
         print("GitHub username is missing. Set 'username' in mapping or pass --username.", file=sys.stderr)
+        return None
+    return mapping, mapping_hash, username
+
+
+def sync_account(
+    args: argparse.Namespace,
+    token: str | None,
+    cache: ResponseCache | None,
+    pool: ConnectionPool,
+    store: StarStore | None,
+) -> int:
+    """Sync one mapping into its outputs with the given shared resources; return the exit status."""
+    loaded = load_mapping(args)
+    if loaded is None:
         return 1
+    mapping, mapping_hash, username = loaded
 
-    token = os.environ.get(args.token_env)
+    previous = load_previous_output(args)
     try:
-        starred_repos = fetch_all_starred_repos(username, token)
-        dataset, warnings = build_grouped_dataset(mapping, starred_repos)
+        if args.offline:
+            starred_repos, last_full_sync_at = load_stored_stars(store, username)
+            if not args.incremental:
+                last_full_sync_at = None
+        else:
+            starred_repos, last_full_sync_at = sync_stars(args, username, token, cache, pool, previous, store)
+        enrich_stars(args, starred_repos, token, pool, offline=args.offline)
+        dataset, warnings = build_dataset(args, mapping, mapping_hash, starred_repos, last_full_sync_at)
     except Exception as error:  # noqa: BLE001
-        print(f"Failed to sync stars: {error}", file=sys.stderr)
+        print(f"Failed to sync stars for {username}: {error}", file=sys.stderr)
         return 1
 
-    args.output.parent.mkdir(parents=True, exist_ok=True)
-    with args.output.open("w", encoding="utf-8") as handle:
-        json.dump(dataset, handle, indent=2)
-        handle.write("\n")
+    status = write_outputs(args, mapping, dataset, warnings, previous)
+    if status in (0, args.unchanged_exit_code):
+        record_run(args, "sync_starred_lists", args.mapping, output_paths(args))
+    return status
 
-    print(f"Fetched {len(starred_repos)} starred repositories for {username}.")
-    print(f"Wrote grouped dataset to {args.output}.")
 
-    unlisted_group = next(
-        (group for group in dataset["groups"] if group.get("slug") == (mapping.get("unlisted", {}) or {}).get("slug", "to-classify")),
-        None,
-    )
-    if isinstance(unlisted_group, dict):
-        unlisted_repos = unlisted_group.get("repos", [])
-        if isinstance(unlisted_repos, list) and unlisted_repos:
-            print(f"{len(unlisted_repos)} repositories are still unassigned.")
+def mapping_stat(path: Path) -> tuple[int, int] | None:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
 
-    for warning in warnings:
-        print(f"Warning: {warning}", file=sys.stderr)
 
-    return 0
+def merge_polled_page(
+    payload: list[dict[str, Any]],
+    starred_repos: list[StarredRepo],
+    username: str,
+    token: str | None,
+    cache: ResponseCache | None,
+    pool: ConnectionPool,
+) -> tuple[list[StarredRepo], list[StarredRepo], list[StarredRepo]]:
+    """Apply a changed newest stars page, reading further pages while every star on it is new."""
+    newest = [normalize_repo(item) for item in payload]
+    known_stars = {star_key(repo) for repo in starred_repos}
+    if len(payload) == PER_PAGE and not any(star_key(repo) in known_stars for repo in newest):
+        # More than a page of new stars: read on until a known one, like --incremental.
+        pages = iter_starred_pages(username, token, cache, pool, start_page=2)
+        newest += fetch_new_starred_repos(pages, known_stars)
+    return apply_newest_stars(starred_repos, newest, complete=len(payload) < PER_PAGE)
+
+
+def watch(
+    args: argparse.Namespace,
+    token: str | None,
+    cache: ResponseCache | None,
+    pool: ConnectionPool,
+    store: StarStore | None,
+) -> int:
+    """Sync once, then keep the outputs fresh from the newest stars page until interrupted.
+
+    The star list and the last dataset stay in memory between polls. A poll
+    that GitHub answers with 304 does nothing; otherwise its stars are merged
+    into the list and the outputs rewritten if the dataset changed. Stars
+    unstarred further down the list are picked up by a full sync every
+    --reconcile-after hours, and an edited mapping is reloaded.
+    """
+    loaded = load_mapping(args)
+    if loaded is None:
+        return 1
+    mapping, mapping_hash, username = loaded
+    watched_stat = mapping_stat(args.mapping)
+
+    previous = load_previous_output(args)
+    try:
+        starred_repos, last_full_sync_at = sync_stars(args, username, token, cache, pool, previous, store)
+        enrich_stars(args, starred_repos, token, pool)
+        dataset, warnings = build_dataset(args, mapping, mapping_hash, starred_repos, last_full_sync_at)
+    except Exception as error:  # noqa: BLE001
+        print(f"Failed to sync stars for {username}: {error}", file=sys.stderr)
+        return 1
+    status = write_outputs(args, mapping, dataset, warnings, previous)
+    if status not in (0, args.unchanged_exit_code):
+        return status
+    record_run(args, "sync_starred_lists", args.mapping, output_paths(args))
+
+    # The last dataset known to be on disk; a newer one that failed to write is retried each poll.
+    written = dataset
+    reconciled_at = time.monotonic()
+    etag: str | None = None
+    print(f"Watching stars of {username} every {args.watch:g}s, press Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(args.watch)
+            try:
+                rebuild = watched_stat != mapping_stat(args.mapping)
+                if rebuild:
+                    watched_stat = mapping_stat(args.mapping)
+                    loaded = load_mapping(args)
+                    if loaded is None:
+                        print("Keeping the last good mapping.", file=sys.stderr)
+                        rebuild = False
+                    elif loaded[2] != username:
+                        print(
+                            f"Mapping now names {loaded[2]}; restart --watch to follow another account.",
+                            file=sys.stderr,
+                        )
+                        rebuild = False
+                    else:
+                        mapping, mapping_hash, _ = loaded
+                        print(f"Reloaded mapping file: {args.mapping}")
+
+                if time.monotonic() - reconciled_at >= args.reconcile_after * 3600:
+                    starred_repos, last_full_sync_at = sync_stars(args, username, token, cache, pool, written, store)
+                    reconciled_at = time.monotonic()
+                    rebuild = True
+                else:
+                    payload, etag = poll_starred_page(username, token, etag, pool)
+                    if payload is not None:
+                        starred_repos, changed, removed = merge_polled_page(
+                            payload, starred_repos, username, token, cache, pool
+                        )
+                        if changed or removed:
+                            rebuild = True
+                            if store is not None:
+                                with METRICS.stage("store_write"):
+                                    store.add_stars(username, (repo.to_json() for repo in changed))
+                                    store.remove_stars(username, (repo.id for repo in removed))
+                if rebuild:
+                    if args.enrich:
+                        # Enrichment sets details in place; copies keep the written dataset as it was.
+                        starred_repos = [replace(repo) for repo in starred_repos]
+                        enrich_stars(args, starred_repos, token, pool)
+                    dataset, warnings = build_dataset(args, mapping, mapping_hash, starred_repos, last_full_sync_at)
+            except DeadlineExceeded:
+                print("Run deadline reached, stopped watching.")
+                return 0
+            except (OSError, RuntimeError, ValueError) as error:
+                print(f"Watch update failed, retrying in {args.watch:g}s: {error}", file=sys.stderr)
+                continue
+
+            if dataset is written:
+                continue
+            status = write_outputs(args, mapping, dataset, warnings, written)
+            if status not in (0, args.unchanged_exit_code):
+                print(f"Retrying the write in {args.watch:g}s.", file=sys.stderr)
+                continue
+            written = dataset
+            if status == 0:
+                record_run(args, "sync_starred_lists", args.mapping, output_paths(args))
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+        return 0
 
 
 if __name__ == "__main__":
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""Tests for the stars scripts against a local stub of the GitHub REST and GraphQL APIs.
+
+Run from the repository root with ``python -m unittest discover scripts``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+import import_starred_lists_from_ui as importer
+import stars_http
+import sync_starred_lists as sync
+from stars_http import ConnectionPool, RequestScheduler, ResponseCache, fetch
+from stars_metrics import METRICS
+from stars_output import iter_json, json_default
+
+USERNAME = "stub-user"
+TOKEN = "stub-token"
+STAR_COUNT = 250
+
+
+def star_item(index: int) -> dict[str, Any]:
+    """Return the REST star item for the index-th newest star."""
+    seconds = 100_000 - index
+    return {
+        "starred_at": f"2026-01-01T{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}Z",
+        "repo": {
+            "id": 1_000_000 - index,
+            "full_name": f"owner{index % 7}/repo-{index}",
+            "html_url": f"https://github.com/owner{index % 7}/repo-{index}",
+            "description": None if index % 5 == 0 else f"Repository {index} — café",
+            "stargazers_count": index * 3,
+            "forks_count": index % 11,
+            "language": None if index % 4 == 0 else ["Go", "Python", "Rust"][index % 3],
+            "archived": index % 13 == 0,
+            "fork": index % 17 == 0,
+            "topics": [f"topic-{index % 3}", f"topic-{index % 5}"][: index % 3],
+            "updated_at": "2026-02-01T00:00:00Z",
+        },
+    }
+
+
+class StubGitHub(BaseHTTPRequestHandler):
+    """Serve starred pages with ETags over GET and the starred connection over GraphQL POST."""
+
+    protocol_version = "HTTP/1.1"
+    stars: list[dict[str, Any]] = []
+    requests: list[tuple[str, int]] = []
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        pass
+
+    def send_body(self, status: int, body: bytes, headers: dict[str, str]) -> None:
+        type(self).requests.append((self.command, status))
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:  # noqa: N802
+        query = parse_qs(urlparse(self.path).query)
+        per_page = int(query["per_page"][0])
+        page = int(query["page"][0])
+        body = json.dumps(self.stars[(page - 1) * per_page : page * per_page]).encode("utf-8")
+        etag = f'"{hashlib.sha256(body).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_body(304, b"", {"ETag": etag})
+            return
+        last_page = max(1, -(-len(self.stars) // per_page))
+        link = f'<http://stub/starred?per_page={per_page}&page={last_page}>; rel="last"'
+        self.send_body(200, body, {"ETag": etag, "Link": link, "Content-Type": "application/json"})
+
+    def do_POST(self) -> None:  # noqa: N802
+        variables = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["variables"]
+        start = int(variables["after"] or 0)
+        end = min(len(self.stars), start + variables["first"])
+        edges = []
+        for item in self.stars[start:end]:
+            repo = item["repo"]
+            edges.append(
+                {
+                    "starredAt": item["starred_at"],
+                    "node": {
+                        "databaseId": repo["id"],
+                        "nameWithOwner": repo["full_name"],
+                        "url": repo["html_url"],
+                        "description": repo["description"],
+                        "stargazerCount": repo["stargazers_count"],
+                        "forkCount": repo["forks_count"],
+                        "primaryLanguage": {"name": repo["language"]} if repo["language"] else None,
+                        "isArchived": repo["archived"],
+                        "isFork": repo["fork"],
+                        "repositoryTopics": {"nodes": [{"topic": {"name": name}} for name in repo["topics"]]},
+                        "updatedAt": repo["updated_at"],
+                    },
+                }
+            )
+        connection = {"pageInfo": {"hasNextPage": end < len(self.stars), "endCursor": str(end)}, "edges": edges}
+        body = json.dumps({"data": {"user": {"starredRepositories": connection}}}).encode("utf-8")
+        self.send_body(200, body, {"Content-Type": "application/json"})
+
+
+class StubServerTestCase(unittest.TestCase):
+    """Start the stub server and route the scripts' requests to it without pacing."""
+
+    server: ThreadingHTTPServer
+    base_url: str
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubGitHub)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self) -> None:
+        StubGitHub.stars = [star_item(index) for index in range(STAR_COUNT)]
+        StubGitHub.requests = []
+        METRICS.reset()
+        scheduler = mock.patch.object(stars_http, "SCHEDULER", RequestScheduler(max_rps=0, max_retries=0))
+        page_url = mock.patch.object(
+            sync,
+            "starred_page_url",
+            lambda username, page: f"{self.base_url}/starred?per_page={sync.PER_PAGE}&page={page}",
+        )
+        for patcher in (scheduler, page_url):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def make_pool(self) -> ConnectionPool:
+        pool = ConnectionPool()
+        self.addCleanup(pool.close)
+        return pool
+
+
+class ResponseCacheTests(StubServerTestCase):
+    def check_not_modified(self, pool: ConnectionPool | None) -> None:
+        url = sync.starred_page_url(USERNAME, 1)
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResponseCache(Path(directory), max_age=3600, max_bytes=10 * 1024 * 1024)
+            first = fetch(url, sync.api_headers(None), cache, pool)
+            second = fetch(url, sync.api_headers(None), cache, pool)
+
+        self.assertFalse(first.from_cache)
+        self.assertTrue(second.from_cache)
+        self.assertEqual(second.body, first.body)
+        self.assertEqual(second.headers.get("Link"), first.headers.get("Link"))
+        self.assertEqual(StubGitHub.requests, [("GET", 200), ("GET", 304)])
+        counters = METRICS.snapshot()["counters"]
+        self.assertEqual(counters.get("cache_misses"), 1)
+        self.assertEqual(counters.get("cache_hits"), 1)
+
+    def test_not_modified_is_served_from_cache(self) -> None:
+        self.check_not_modified(None)
+
+    def test_not_modified_is_served_from_cache_through_pool(self) -> None:
+        self.check_not_modified(self.make_pool())
+
+    def test_unwritable_cache_falls_back_to_a_plain_fetch(self) -> None:
+        url = sync.starred_page_url(USERNAME, 1)
+        with tempfile.TemporaryDirectory() as directory:
+            blocker = Path(directory) / "cache"
+            blocker.write_text("not a directory", encoding="utf-8")
+            cache = ResponseCache(blocker, max_age=3600, max_bytes=10 * 1024 * 1024)
+            with mock.patch("sys.stderr"):
+                responses = [fetch(url, sync.api_headers(None), cache) for _ in range(2)]
+
+        self.assertEqual([response.from_cache for response in responses], [False, False])
+        self.assertEqual(responses[0].body, responses[1].body)
+        counters = METRICS.snapshot()["counters"]
+        self.assertEqual(counters.get("cache_misses"), 2)
+        self.assertEqual(counters.get("cache_write_errors"), 2)
+
+
+class BackendParityTests(StubServerTestCase):
+    mapping = {
+        "username": USERNAME,
+        "lists": [
+            {"slug": "go", "name": "Go", "repos": ["owner1/*", "owner3/repo-3"]},
+            {"slug": "misc", "name": "Misc", "repos": ["owner2/repo-2", "OWNER3/REPO-10"]},
+        ],
+    }
+
+    def rest_repos(self, concurrency: int, pool: ConnectionPool | None) -> list[sync.StarredRepo]:
+        return sync.fetch_all_starred_repos(USERNAME, None, concurrency, pool=pool)
+
+    def graphql_repos(self, pool: ConnectionPool | None) -> list[sync.StarredRepo]:
+        pages = sync.iter_graphql_starred_pages(USERNAME, TOKEN, f"{self.base_url}/graphql", pool)
+        return [sync.normalize_repo(item) for page in pages for item in page]
+
+    def grouped_json(self, repos: list[sync.StarredRepo]) -> str:
+        dataset, _ = sync.build_grouped_dataset(self.mapping, repos)
+        dataset.pop("generated_at")
+        return json.dumps(dataset, default=json_default)
+
+    def test_backends_build_the_same_dataset(self) -> None:
+        expected = self.grouped_json(self.graphql_repos(None))
+        self.assertIn(f'"total_repos": {STAR_COUNT}', expected)
+        for concurrency, pool in ((1, None), (4, None), (4, self.make_pool())):
+            with self.subTest(concurrency=concurrency, pooled=pool is not None):
+                self.assertEqual(self.grouped_json(self.rest_repos(concurrency, pool)), expected)
+
+    def test_graphql_repos_match_rest_records(self) -> None:
+        pool = self.make_pool()
+        self.assertEqual(self.graphql_repos(pool), self.rest_repos(1, pool))
+
+
+class IterJsonTests(unittest.TestCase):
+    payload = {
+        "username": "stub-user",
+        "total_repos": 3,
+        "empty_list": [],
+        "empty_dict": {},
+        "unicode": "café — \U0001f600",
+        "floats": [0.1, -2.5e-07, 1e21],
+        "groups": [
+            {"slug": "a", "repos": [sync.normalize_repo(star_item(1)), sync.normalize_repo(star_item(4))]},
+            {"slug": "b", "repos": [], "nested": {"deep": [[1, [2, {"x": None}]], True, False]}},
+        ],
+    }
+
+    def test_matches_json_dumps(self) -> None:
+        for indent in (None, 2, 4):
+            for sort_keys in (False, True):
+                for stream_depth in (0, 1, 3, 10):
+                    with self.subTest(indent=indent, sort_keys=sort_keys, stream_depth=stream_depth):
+                        expected = json.dumps(
+                            self.payload,
+                            indent=indent,
+                            separators=(",", ": ") if indent is not None else (",", ":"),
+                            sort_keys=sort_keys,
+                            default=json_default,
+                        )
+                        text = "".join(iter_json(self.payload, indent, sort_keys, stream_depth))
+                        self.assertEqual(text, expected)
+
+    def test_scalars_and_empty_containers(self) -> None:
+        for value in (None, 0, "text", [], {}, [[]], {"a": {}}):
+            with self.subTest(value=value):
+                self.assertEqual("".join(iter_json(value, 2)), json.dumps(value, indent=2))
+
+
+class ApplyNewestStarsTests(unittest.TestCase):
+    def repos(self, *indexes: int) -> list[sync.StarredRepo]:
+        return [sync.normalize_repo(star_item(index)) for index in indexes]
+
+    def ids(self, repos: list[sync.StarredRepo]) -> list[int]:
+        return [1_000_000 - repo.id for repo in repos]
+
+    def test_adds_new_stars_and_drops_unstars_inside_the_window(self) -> None:
+        known = self.repos(1, 2, 3, 4, 5, 6)
+        known[1].details = {"license": "MIT"}
+        # Star 0 is new, star 3 was unstarred; 5 and 6 are older than the page.
+        newest = self.repos(0, 1, 2, 4)
+        merged, changed, removed = sync.apply_newest_stars(known, newest, complete=False)
+
+        self.assertEqual(self.ids(merged), [0, 1, 2, 4, 5, 6])
+        self.assertEqual(self.ids(changed), [0])
+        self.assertEqual(self.ids(removed), [3])
+        self.assertEqual(merged[2].details, {"license": "MIT"})
+
+    def test_changed_stars_replace_their_entries(self) -> None:
+        known = self.repos(1, 2)
+        newest = self.repos(1, 2)
+        newest[1].stargazers_count += 1
+        merged, changed, removed = sync.apply_newest_stars(known, newest, complete=False)
+
+        self.assertEqual(self.ids(changed), [2])
+        self.assertEqual(merged[1].stargazers_count, known[1].stargazers_count + 1)
+        self.assertEqual(removed, [])
+
+    def test_complete_page_drops_every_missing_star(self) -> None:
+        merged, changed, removed = sync.apply_newest_stars(self.repos(1, 2, 3), self.repos(2), complete=True)
+
+        self.assertEqual(self.ids(merged), [2])
+        self.assertEqual(changed, [])
+        self.assertEqual(self.ids(removed), [1, 3])
+
+    def test_empty_page_keeps_the_list_unless_complete(self) -> None:
+        known = self.repos(1, 2)
+        self.assertEqual(sync.apply_newest_stars(known, [], complete=False), (known, [], []))
+        self.assertEqual(sync.apply_newest_stars(known, [], complete=True), ([], [], known))
+
+
+class ListPagingTests(unittest.TestCase):
+    list_url = "https://github.com/stars/stub-user/lists/tools"
+
+    def list_page(self, members: list[str], next_page: int | None) -> str:
+        items = "".join(
+            f'<li><a href="/{name}">{name}</a> Forked from <a href="/up/{name.split("/")[1]}">upstream</a></li>'
+            for name in members
+        )
+        footer = f'<a rel="next" href="{self.list_url}?page={next_page}">Next</a>' if next_page else ""
+        return f'<nav><a href="/features">Features</a></nav><ul>{items}</ul>{footer}'
+
+    def fetch_pages(self, pages: dict[str, str]) -> Any:
+        def fetch_list_page(url: str, *args: Any) -> tuple[set[str], str | None]:
+            parser = importer.ListPageParser(url)
+            parser.feed(pages[url])
+            parser.close()
+            return parser.repos, parser.next_url
+
+        return mock.patch.object(importer, "fetch_list_page", fetch_list_page)
+
+    def test_count_does_not_stop_paging_early(self) -> None:
+        pages = {
+            self.list_url: self.list_page(["a/1", "a/2", "a/3"], 2),
+            f"{self.list_url}?page=2": self.list_page(["a/4", "a/5", "a/6"], None),
+        }
+        for count in (None, 6):
+            with self.subTest(count=count), self.fetch_pages(pages):
+                repos, fingerprint, unchanged = importer.fetch_list_repos(self.list_url, None, 25, count=count)
+                self.assertFalse(unchanged)
+                self.assertTrue({f"a/{index}" for index in range(1, 7)} <= set(repos))
+                self.assertEqual(fingerprint["repos"], repos)
+                self.assertEqual(fingerprint["count"], count)
+
+    def test_warns_when_the_page_budget_runs_out(self) -> None:
+        pages = {
+            self.list_url: self.list_page(["a/1"], 2),
+            f"{self.list_url}?page=2": self.list_page(["a/2"], 3),
+            f"{self.list_url}?page=3": self.list_page(["a/3"], None),
+        }
+        with self.fetch_pages(pages), mock.patch("sys.stderr") as stderr:
+            repos, _, _ = importer.fetch_list_repos(self.list_url, None, 2)
+        self.assertEqual([repo for repo in repos if repo.startswith("a/")], ["a/1", "a/2"])
+        self.assertIn("raise --max-pages", "".join(call.args[0] for call in stderr.write.call_args_list))
+
+    def test_count_in_link_text(self) -> None:
+        self.assertEqual(importer.list_repo_count("Big 1,234 repositories"), 1234)
+        self.assertEqual(importer.list_repo_count("Tools 7 repositories"), 7)
+        self.assertIsNone(importer.list_repo_count("Tools"))
+        self.assertEqual(importer.clean_list_name("Tools 7 repositories", "tools"), "Tools")
+
+
+if __name__ == "__main__":
+    unittest.main()
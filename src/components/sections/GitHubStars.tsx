@@ -16,6 +16,14 @@ type StarredRepository = {
   topics: string[];
   updated_at: string;
   starred_at: string | null;
+  latest_release?: {
+    tag_name: string | null;
+    name: string | null;
+    published_at: string | null;
+    html_url: string | null;
+  } | null;
+  open_issues_count?: number | null;
+  license?: string | null;
 };
 
 type StarredGroup = {